@@ -0,0 +1,156 @@
+"""
+Join latency: time from on_user_join being called until the user's welcome
+chat is handed to the outbound queue, measured against a fake Highrise
+client with a synthetic ranks file.
+
+    python benchmarks/bench_join_pipeline.py [ranked users] [joins]
+
+Joins arrive every JOIN_GAP seconds while CHURN stat updates land between
+them, and the champion ranking goes stale every CHAMPION_REFRESH seconds, so
+background rank rebuilds overlap the joins. The welcome window is shortened
+to WINDOW; the run fails unless p99 stays within WINDOW + TARGET_OVERHEAD.
+
+The "old file work" column times what each join used to do on top of that:
+parse joined_users.json, parse ranks.json twice and sort it for the ranks.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+WINDOW = 0.05
+JOIN_GAP = 0.005
+CHURN = 20
+CHAMPION_REFRESH = 0.1
+TARGET_OVERHEAD = 0.025   # allowed p99 latency on top of the welcome window
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class FakeHighrise:
+    """Accepts every call the bot makes and answers after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.ws = types.SimpleNamespace(closed=False)
+        self.calls = 0
+
+    def __getattr__(self, name):
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self.latency)
+            self.calls += 1
+            return types.SimpleNamespace(content=[], outfit=[])
+        return call
+
+
+def make_ranks(n: int) -> dict:
+    rng = random.Random(n)
+    return {
+        f"{i:024x}": {
+            "username": f"user{i}",
+            "messages": rng.randint(0, 50_000),
+            "time": rng.randint(0, 5_000_000),
+        }
+        for i in range(n)
+    }
+
+
+def old_file_work(ranks_path: str, joined_path: str):
+    with open(joined_path, "r") as f:
+        json.load(f)
+    for _ in range(2):
+        with open(ranks_path, "r") as f:
+            data = json.load(f)
+    sorted(data, key=lambda uid: -data[uid]["messages"])
+    sorted(data, key=lambda uid: -data[uid]["time"])
+    sorted(data, key=lambda uid: -(data[uid]["messages"] + data[uid]["time"]))
+
+
+def percentile(samples: list, pct: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+async def bench(ranked: int, joins: int):
+    from highrise.models import User, Position
+    import main
+    from functions import leaderboard
+
+    leaderboard.CHAMPION_REFRESH = CHAMPION_REFRESH
+    bot = main.Bot()
+    bot.highrise = FakeHighrise()
+    bot.welcomes.window = WINDOW
+    main.warm_ranks()
+
+    rng = random.Random(1)
+    ranked_ids = [f"{i:024x}" for i in rng.sample(range(ranked), min(joins, ranked))]
+    users = [User(id=uid, username=f"user{int(uid, 16)}") for uid in ranked_ids]
+    users += [User(id=f"new{i}", username=f"newcomer{i}") for i in range(joins - len(users))]
+
+    started, samples = {}, []
+    queue_chat = bot.outbound.chat
+
+    def chat(text, priority=main.outbound.BROADCAST):
+        now = time.perf_counter()
+        for name in re.findall(r"@([\w.]+)", text):
+            start = started.pop(name, None)
+            if start is not None:
+                samples.append(now - start)
+        return queue_chat(text, priority)
+
+    bot.outbound.chat = chat
+    for user in users:
+        for _ in range(CHURN):
+            i = rng.randrange(ranked)
+            main.update_user_stats(f"{i:024x}", f"user{i}", inc_msg=True, inc_time=rng.randint(1, 60))
+        started[user.username] = time.perf_counter()
+        await bot.on_user_join(user, Position(1, 0, 1, "FrontRight"))
+        await asyncio.sleep(JOIN_GAP)
+    await bot.welcomes.flush()
+    await bot.outbound.drain(30)
+    bot.outbound.close()
+    # Write everything out while the temp dir still exists, not at exit.
+    main.save_on_exit(bot)
+    if started:
+        raise RuntimeError(f"{len(started)} joins were never welcomed")
+    return samples
+
+
+def main():
+    ranked = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    joins = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    with tempfile.TemporaryDirectory() as directory:
+        # The bot's relative data paths (ranks, joined users, logs) resolve here.
+        os.chdir(directory)
+        os.makedirs("data")
+        with open("data/ranks.json", "w") as f:
+            json.dump(make_ranks(ranked), f)
+        with open("data/joined_users.json", "w") as f:
+            json.dump({f"user{i}": 0 for i in range(0, ranked, 2)}, f)
+
+        samples = asyncio.run(bench(ranked, joins))
+        start = time.perf_counter()
+        old_file_work("data/ranks.json", "data/joined_users.json")
+        old = time.perf_counter() - start
+
+    p99 = percentile(samples, 0.99)
+    target = WINDOW + TARGET_OVERHEAD
+    print(f"{'ranked':>8} {'joins':>6} {'p50':>9} {'p99':>9} {'max':>9} {'target':>9} {'old file work':>14}")
+    print(
+        f"{ranked:>8} {joins:>6} "
+        f"{statistics.median(samples) * 1e3:>7.1f}ms {p99 * 1e3:>7.1f}ms "
+        f"{max(samples) * 1e3:>7.1f}ms {target * 1e3:>7.1f}ms {old * 1000:>12.1f}ms"
+    )
+    if p99 > target:
+        print(f"FAIL: p99 join-to-queue latency is over the {target * 1e3:.0f}ms target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
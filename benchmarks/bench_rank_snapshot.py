@@ -0,0 +1,82 @@
+"""
+Load-time comparison of the ranks.json snapshot and the binary snapshot.
+
+    python benchmarks/bench_rank_snapshot.py [sizes...]
+"""
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import rank_snapshot
+
+
+def make_ranks(n: int) -> dict:
+    rng = random.Random(n)
+    data = {}
+    for i in range(n):
+        user_id = f"{i:024x}"
+        name = "".join(rng.choices(string.ascii_letters + string.digits + "_.", k=rng.randint(3, 16)))
+        data[user_id] = {
+            "username": name,
+            "messages": rng.randint(0, 50_000),
+            "time": rng.randint(0, 5_000_000),
+        }
+    return data
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(n: int, directory: str):
+    data = make_ranks(n)
+    json_path = os.path.join(directory, f"ranks_{n}.json")
+    bin_path = os.path.join(directory, f"ranks_{n}.bin")
+    with open(json_path, "w") as f:
+        json.dump(data, f, indent=2)
+    rank_snapshot.write_snapshot(bin_path, data)
+
+    def load_json():
+        with open(json_path, "r") as f:
+            return json.load(f)
+
+    def open_lazy():
+        with rank_snapshot.RankSnapshot(bin_path) as snapshot:
+            return snapshot.record(len(snapshot) // 2)
+
+    assert rank_snapshot.load_snapshot(bin_path) == data
+    return (
+        n,
+        os.path.getsize(json_path),
+        os.path.getsize(bin_path),
+        timed(load_json),
+        timed(lambda: rank_snapshot.load_snapshot(bin_path)),
+        timed(open_lazy),
+    )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'users':>9} {'json MB':>8} {'bin MB':>7} {'json load':>10} {'bin load':>9} {'bin lazy':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            n, json_size, bin_size, t_json, t_bin, t_lazy = bench(n, directory)
+            print(
+                f"{n:>9} {json_size / 1e6:>8.1f} {bin_size / 1e6:>7.1f} "
+                f"{t_json * 1000:>8.1f}ms {t_bin * 1000:>7.1f}ms {t_lazy * 1000:>7.3f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,21 +9,19 @@ async def handle_bot_position_commands(bot, user, message: str) -> bool:
     # === !sbot – Save current bot location ===
     if msg == "!sbot" and is_owner(user.username):
         try:
-            room_users = await bot.highrise.get_room_users()
-            for room_user, pos in room_users.content:
-                if room_user.username.lower() == user.username.lower():
-                    if hasattr(pos, "x") and hasattr(pos, "y") and hasattr(pos, "z"):
-                        bot.bot_location.update(
-                            x=pos.x,
-                            y=pos.y,
-                            z=pos.z,
-                            facing=getattr(pos, "facing", 0)
-                        )
-                        save_bot_location(bot.bot_location)
-                        await bot.highrise.send_whisper(user.id, f"📍 Bot position saved: {bot.bot_location}")
-                    else:
-                        await bot.highrise.send_whisper(user.id, "❌ Invalid position data.")
-                    break
+            if user.id in bot.roster:
+                pos = bot.roster.get_position(user.id)
+                if hasattr(pos, "x") and hasattr(pos, "y") and hasattr(pos, "z"):
+                    bot.bot_location.update(
+                        x=pos.x,
+                        y=pos.y,
+                        z=pos.z,
+                        facing=getattr(pos, "facing", 0)
+                    )
+                    save_bot_location(bot.bot_location)
+                    await bot.send_safe_whisper(user.id, f"📍 Bot position saved: {bot.bot_location}")
+                else:
+                    await bot.send_safe_whisper(user.id, "❌ Invalid position data.")
         except Exception:
             print("❌ Error saving bot position:")
             traceback.print_exc()
@@ -49,31 +47,26 @@ async def handle_bot_position_commands(bot, user, message: str) -> bool:
         target_username = parts[1].lstrip("@") if len(parts) > 1 else user.username
 
         try:
-            room_users = await bot.highrise.get_room_users()
-            for room_user, pos in room_users.content:
-                if room_user.username.lower() == target_username.lower():
-                    bot.follow_target_user_id = room_user.id
-                    break
-            else:
-                await bot.highrise.send_whisper(user.id, f"❌ User @{target_username} not found.")
+            found = bot.roster.find(target_username)
+            if found is None:
+                await bot.send_safe_whisper(user.id, f"❌ User @{target_username} not found.")
                 return True
+            bot.follow_target_user_id = found[0].id
 
             bot.original_position = Position(**bot.bot_location) if all(k in bot.bot_location for k in ("x", "y", "z")) else None
 
             async def follow_loop():
                 try:
                     while True:
-                        room_users = await bot.highrise.get_room_users()
                         target_pos = None
-                        for ru, pos in room_users.content:
-                            if ru.id == bot.follow_target_user_id:
-                                if hasattr(pos, "x") and hasattr(pos, "y") and hasattr(pos, "z"):
-                                    target_pos = pos
-                                break
+                        if bot.follow_target_user_id in bot.roster:
+                            pos = bot.roster.get_position(bot.follow_target_user_id)
+                            if hasattr(pos, "x") and hasattr(pos, "y") and hasattr(pos, "z"):
+                                target_pos = pos
 
                         if not target_pos:
                             try:
-                                await bot.highrise.send_whisper(user.id, f"❌ @{target_username} left the room. Stopping follow.")
+                                await bot.send_safe_whisper(user.id, f"❌ @{target_username} left the room. Stopping follow.")
                             except Exception:
                                 pass
                             break
@@ -102,13 +95,13 @@ async def handle_bot_position_commands(bot, user, message: str) -> bool:
                         )
                         save_bot_location(bot.bot_location)
                         try:
-                            await bot.highrise.send_whisper(user.id, "🛑 Follow stopped. Returned to base.")
+                            await bot.send_safe_whisper(user.id, "🛑 Follow stopped. Returned to base.")
                         except Exception:
                             pass
                     raise
 
             bot.follow_task = asyncio.create_task(follow_loop())
-            await bot.highrise.send_whisper(user.id, f"🚶 Following @{target_username}")
+            await bot.send_safe_whisper(user.id, f"🚶 Following @{target_username}")
         except Exception:
             traceback.print_exc()
         return True
@@ -119,9 +112,17 @@ async def handle_bot_position_commands(bot, user, message: str) -> bool:
             bot.follow_task.cancel()
             bot.follow_task = None
             bot.follow_target_user_id = None
-            await bot.highrise.send_whisper(user.id, "🛑 Follow stopped.")
+            await bot.send_safe_whisper(user.id, "🛑 Follow stopped.")
         else:
-            await bot.highrise.send_whisper(user.id, "🛑 No follow task is running.")
+            await bot.send_safe_whisper(user.id, "🛑 No follow task is running.")
         return True
 
-    return False
\ No newline at end of file
+    return False
+
+def register_position_commands(router):
+    router.register(
+        handle_bot_position_commands,
+        exact=("!sbot", "!base", "!stop"),
+        prefixes=("!follow",),
+        category="owner",
+    )
\ No newline at end of file
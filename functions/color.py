@@ -1,4 +1,5 @@
 from highrise.models import Item
+from functions.data_store import is_owner
 
 # Define bot owners (lowercase usernames)
 BOT_OWNERS = {"raybm"}
@@ -17,12 +18,12 @@ CATEGORY_MAP = {
 
 async def color(bot, user, message: str):
     if user.username.lower() not in BOT_OWNERS:
-        await bot.highrise.send_whisper(user.id, "❌ You do not have permission to use this command.")
+        await bot.send_safe_whisper(user.id, "❌ You do not have permission to use this command.")
         return
 
     parts = message.strip().split()
     if len(parts) < 3:
-        await bot.highrise.send_whisper(user.id, "❌ Usage: !color <category> <palette_number>")
+        await bot.send_safe_whisper(user.id, "❌ Usage: !color <category> <palette_number>")
         return
 
     if parts[0] != "!color":
@@ -41,13 +42,13 @@ async def color(bot, user, message: str):
             break
 
     if not matched_category:
-        await bot.highrise.send_whisper(user.id, f"❌ Unknown category. Valid: {', '.join(CATEGORY_MAP.keys())}")
+        await bot.send_safe_whisper(user.id, f"❌ Unknown category. Valid: {', '.join(CATEGORY_MAP.keys())}")
         return
 
     try:
         palette_number = int(parts[-1])
     except ValueError:
-        await bot.highrise.send_whisper(user.id, "❌ Palette number must be a valid integer.")
+        await bot.send_safe_whisper(user.id, "❌ Palette number must be a valid integer.")
         return
 
     internal_category = CATEGORY_MAP[matched_category]
@@ -62,15 +63,20 @@ async def color(bot, user, message: str):
             updated = True
 
     if not updated:
-        await bot.highrise.send_whisper(user.id, f"❌ The bot isn't wearing any item from category '{matched_category}'.")
+        await bot.send_safe_whisper(user.id, f"❌ The bot isn't wearing any item from category '{matched_category}'.")
         return
 
     await bot.highrise.set_outfit(outfit)
-    await bot.highrise.send_whisper(user.id, f"✅ Changed color of '{matched_category}' to palette #{palette_number}.")
+    await bot.send_safe_whisper(user.id, f"✅ Changed color of '{matched_category}' to palette #{palette_number}.")
 
 
 async def handle_color_command(bot, user, message: str) -> bool:
+    if not is_owner(user.username):
+        return False
     if message.lower().startswith("!color"):
         await color(bot, user, message)
         return True
-    return False
\ No newline at end of file
+    return False
+
+def register_color_commands(router):
+    router.register(handle_color_command, prefixes=("!color",), category="owner")
\ No newline at end of file
@@ -1,4 +1,5 @@
 import re
+from functions import reply_cache
 from functions.outfit import category_aliases
 from functions.data_store import is_owner, add_owner, remove_owner, list_owners
 
@@ -30,7 +31,8 @@ def get_command_category_menu() -> str:
         "• !botlocation\n"
         "• !owner\n"
         "• !outfit\n"
-        "• !leaderboard"
+        "• !leaderboard\n"
+        "• !emoteloop"
     )
 
 # === Detailed Commands Per Category ===
@@ -79,6 +81,13 @@ def get_category_command_list(category: str) -> str | None:
             "• !follow @user — Bot follows user\n"
             "• !stop — Stop following"
         )
+    elif category == "emoteloop":
+        return (
+            "💃 Emote Loop Commands:\n"
+            "• !groupemote on — Sync everyone looping the same emote\n"
+            "• !groupemote off — Give every loop its own timing\n"
+            "• !groupemote — Show the current mode"
+        )
     elif category == "owner":
         return (
             "👑 Owner Access Commands:\n"
@@ -88,6 +97,20 @@ def get_category_command_list(category: str) -> str | None:
         )
     return None
 
+# === Owner Command Menu Handler ===
+async def handle_command_menu(bot, user, message: str) -> bool:
+    if not is_owner(user.username):
+        return False
+
+    low_msg = message.lower().strip()
+    if low_msg == "!command":
+        await bot.send_reply(user.id, "command_menu")
+        return True
+    m = re.match(r"!(\w+)", low_msg)
+    if m and await bot.send_reply(user.id, f"commands:{m.group(1)}"):
+        return True
+    return False
+
 # === Outfit Category Viewer ===
 def get_outfit_categories_text() -> str:
     return (
@@ -101,6 +124,15 @@ def get_outfit_categories_text() -> str:
         "• 🧸 freckle, 🌸 blush"
     )
 
+# === Cached replies ===
+COMMAND_CATEGORIES = ("leaderboard", "outfit", "floors", "botlocation", "emoteloop", "owner")
+
+reply_cache.register("user_help", lambda: "\n".join(get_user_commands()))
+reply_cache.register("command_menu", get_command_category_menu)
+reply_cache.register("outfit_categories", get_outfit_categories_text)
+for _category in COMMAND_CATEGORIES:
+    reply_cache.register(f"commands:{_category}", lambda c=_category: get_category_command_list(c))
+
 # === Owner Commands Handler ===
 async def handle_owner_commands(bot, user, message: str) -> bool:
     if not is_owner(user.username):
@@ -112,7 +144,7 @@ async def handle_owner_commands(bot, user, message: str) -> bool:
     if lower.startswith("!addo"):
         mentions = re.findall(r"@(\w+)", msg)
         if not mentions:
-            await bot.highrise.send_whisper(user.id, "❌ Usage: `!addo @username`")
+            await bot.send_safe_whisper(user.id, "❌ Usage: `!addo @username`")
             return True
 
         added = []
@@ -121,15 +153,15 @@ async def handle_owner_commands(bot, user, message: str) -> bool:
                 added.append(u)
 
         if added:
-            await bot.highrise.send_whisper(user.id, f"✅ Added to owner list: {', '.join(added)}")
+            await bot.send_safe_whisper(user.id, f"✅ Added to owner list: {', '.join(added)}")
         else:
-            await bot.highrise.send_whisper(user.id, "⚠️ No new owners were added.")
+            await bot.send_safe_whisper(user.id, "⚠️ No new owners were added.")
         return True
 
     elif lower.startswith("!removeo"):
         mentions = re.findall(r"@(\w+)", msg)
         if not mentions:
-            await bot.highrise.send_whisper(user.id, "❌ Usage: `!removeo @username`")
+            await bot.send_safe_whisper(user.id, "❌ Usage: `!removeo @username`")
             return True
 
         removed = []
@@ -138,21 +170,37 @@ async def handle_owner_commands(bot, user, message: str) -> bool:
                 removed.append(u)
 
         if removed:
-            await bot.highrise.send_whisper(user.id, f"🗑️ Removed: {', '.join(removed)}")
+            await bot.send_safe_whisper(user.id, f"🗑️ Removed: {', '.join(removed)}")
         else:
-            await bot.highrise.send_whisper(user.id, "⚠️ No owners were removed.")
+            await bot.send_safe_whisper(user.id, "⚠️ No owners were removed.")
         return True
 
     elif lower in ("!olist", "!listo"):
         owners = list_owners()
         if owners:
-            await bot.highrise.send_whisper(user.id, "👑 Bot Owners:\n" + ", ".join(f"@{o}" for o in owners))
+            await bot.send_safe_whisper(user.id, "👑 Bot Owners:\n" + ", ".join(f"@{o}" for o in owners))
         else:
-            await bot.highrise.send_whisper(user.id, "⚠️ No owners found.")
+            await bot.send_safe_whisper(user.id, "⚠️ No owners found.")
         return True
 
     elif lower == "!outfit list":
-        await bot.highrise.send_whisper(user.id, get_outfit_categories_text())
+        await bot.send_reply(user.id, "outfit_categories")
         return True
 
-    return False
\ No newline at end of file
+    return False
+
+def register_command_menu(router):
+    router.register(
+        handle_command_menu,
+        exact=("!command",),
+        prefixes=("!floors", "!botlocation", "!owner", "!outfit", "!leaderboard", "!emoteloop"),
+        category="owner",
+    )
+
+def register_owner_commands(router):
+    router.register(
+        handle_owner_commands,
+        exact=("!olist", "!listo", "!outfit list"),
+        prefixes=("!addo", "!removeo"),
+        category="owner",
+    )
\ No newline at end of file
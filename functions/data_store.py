@@ -1,5 +1,13 @@
 import os
+import copy
 import json
+import time
+
+from functions import persistence, sqlite_store
+
+# "json" (default) keeps one file per data set, "sqlite" stores rows in
+# functions/data/kybot.db (see functions/sqlite_store.py).
+BACKEND = os.environ.get("KYBOT_STORE", "json").lower()
 
 # === JSON Paths ===
 BASE_PATH = os.path.join(os.path.dirname(__file__), "data")
@@ -28,11 +36,69 @@ def load_json(path, default):
         return default
 
 def save_json(path, data):
+    """Queue `data` for writing on the persistence thread; returns a Future."""
+    return persistence.write_json(path, data, indent=2, ensure_ascii=False)
+
+# === Cached loaders ===
+# Every data set is kept in memory after its first load. The backing file's
+# mtime is re-checked at most once per CACHE_CHECK_INTERVAL seconds so edits
+# made outside the bot are still picked up; saves write through the cache.
+CACHE_CHECK_INTERVAL = 5
+
+_cache = {}             # name -> [data, mtime, checked_at]
+_owner_set = set()      # lowercase owners, derived from the cached list
+_owner_source = None    # cached owners list `_owner_set` was built from
+
+def _mtime(name: str):
+    if BACKEND == "sqlite":
+        return None  # rows only change through this module
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception:
-        pass
+        return os.stat(PATHS[name]).st_mtime_ns
+    except OSError:
+        return None
+
+def _read(name: str, default):
+    if BACKEND == "sqlite":
+        if name == "owners":
+            return sqlite_store.load_owners()
+        return sqlite_store.load_collection(name) or default
+    return load_json(PATHS[name], default)
+
+def _cached(name: str, default):
+    now = time.monotonic()
+    entry = _cache.get(name)
+    if entry is not None:
+        if now - entry[2] < CACHE_CHECK_INTERVAL:
+            return entry[0]
+        mtime = _mtime(name)
+        if mtime == entry[1]:
+            entry[2] = now
+            return entry[0]
+    else:
+        mtime = _mtime(name)
+    data = _read(name, default)
+    _cache[name] = [data, mtime, now]
+    return data
+
+def _load(name: str, default):
+    return copy.deepcopy(_cached(name, default))
+
+def _save(name: str, data):
+    snapshot = copy.deepcopy(data)
+    entry = _cache[name] = [snapshot, _mtime(name), time.monotonic()]
+    if BACKEND == "sqlite":
+        fut = persistence.submit(sqlite_store.save_collection, name, snapshot)
+    else:
+        fut = save_json(PATHS[name], snapshot)
+    # Record the mtime of our own write so it does not look like an outside edit.
+    fut.add_done_callback(lambda _: entry.__setitem__(1, _mtime(name)))
+    return fut
+
+def invalidate_cache(name: str = None):
+    if name is None:
+        _cache.clear()
+    else:
+        _cache.pop(name, None)
 
 # === Init all files once ===
 ensure_json(PATHS["owners"], [])
@@ -42,44 +108,72 @@ ensure_json(PATHS["free_items"], {})
 ensure_json(PATHS["floors"], {})
 ensure_json(PATHS["ranks"], {})
 
+if BACKEND == "sqlite":
+    sqlite_store.migrate_from_json(PATHS)
+
 # === Owner Handling ===
+def _owners() -> set[str]:
+    global _owner_set, _owner_source
+    owners = _cached("owners", [])
+    if owners is not _owner_source:
+        _owner_set = {u.lower() for u in owners}
+        _owner_source = owners
+    return _owner_set
+
 def list_owners() -> list[str]:
-    return sorted(load_json(PATHS["owners"], []))
+    return sorted(_cached("owners", []))
 
 def is_owner(username: str) -> bool:
-    return username.lower() in [u.lower() for u in list_owners()]
+    return username.lower() in _owners()
 
 def add_owner(username: str) -> bool:
-    owners = set(list_owners())
-    if username.lower() not in owners:
-        owners.add(username.lower())
-        save_json(PATHS["owners"], sorted(owners))
-        return True
-    return False
+    name = username.lower()
+    if name in _owners():
+        return False
+    owners = sorted(_owners() | {name})
+    if BACKEND == "sqlite":
+        _cache["owners"] = [owners, None, time.monotonic()]
+        persistence.submit(sqlite_store.add_owner, name)
+    else:
+        _save("owners", owners)
+    return True
 
 def remove_owner(username: str) -> bool:
-    owners = set(list_owners())
-    if username.lower() in owners:
-        owners.remove(username.lower())
-        save_json(PATHS["owners"], sorted(owners))
-        return True
-    return False
+    name = username.lower()
+    if name not in _owners():
+        return False
+    owners = sorted(_owners() - {name})
+    if BACKEND == "sqlite":
+        _cache["owners"] = [owners, None, time.monotonic()]
+        persistence.submit(sqlite_store.remove_owner, name)
+    else:
+        _save("owners", owners)
+    return True
 
 # === Bot Location ===
 def load_bot_location() -> dict:
-    return load_json(PATHS["bot_location"], {})
+    return _load("bot_location", {})
 
 def save_bot_location(data: dict):
-    save_json(PATHS["bot_location"], data)
+    _save("bot_location", data)
 
 # === Floors ===
 def load_floors() -> dict:
-    return load_json(PATHS["floors"], {})
+    return _load("floors", {})
 
 def save_floors(data: dict):
-    save_json(PATHS["floors"], data)
+    _save("floors", data)
 
 # === Outfit ===
+def load_saved_fits() -> dict:
+    return _load("saved_fits", {})
+
+def save_saved_fits(data: dict):
+    _save("saved_fits", data)
+
+def load_free_items() -> dict:
+    return _load("free_items", {})
+
 def get_saved_fits_path() -> str:
     return PATHS["saved_fits"]
 
@@ -91,7 +185,21 @@ def get_path(name: str) -> str:
 
 # === Ranks ===
 def load_ranks_data() -> dict:
+    if BACKEND == "sqlite":
+        return sqlite_store.load_ranks()
     return load_json(PATHS["ranks"], {})
 
 def save_ranks_data(data: dict):
-    save_json(PATHS["ranks"], data)
\ No newline at end of file
+    if BACKEND == "sqlite":
+        return persistence.submit(sqlite_store.replace_ranks, copy.deepcopy(data))
+    return save_json(PATHS["ranks"], data)
+
+def save_rank_rows(rows: dict):
+    """
+    Persist only the given user_id -> record entries. sqlite backend only:
+    on JSON the leaderboard keeps its own snapshot and journal.
+    """
+    if BACKEND != "sqlite":
+        raise RuntimeError("save_rank_rows needs the sqlite backend")
+    rows = {uid: dict(record) for uid, record in rows.items()}
+    return persistence.submit(sqlite_store.save_rank_rows, rows)
@@ -0,0 +1,85 @@
+import asyncio
+import traceback
+from collections import deque
+
+# === Per-user event dispatch ===
+# Events are queued per key (normally the user id) and run by a fixed pool of
+# worker tasks. A key is owned by at most one worker at a time, so one user's
+# events run in arrival order while different users are handled concurrently.
+
+WORKERS = 8
+MAX_PENDING = 32    # per key; events beyond this are dropped
+BATCH = 4           # events a worker runs for one key before yielding to others
+
+
+class EventDispatcher:
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queues = {}       # key -> deque of (fn, args); present while scheduled or running
+        self._ready = None      # asyncio.Queue of keys with pending events
+        self._tasks = []
+
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        if self.running():
+            return
+        # Workers from an earlier event loop are gone along with their queue;
+        # whatever they left scheduled can no longer run.
+        self._queues.clear()
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5):
+        """Let queued events finish (up to `timeout` seconds), then stop the workers."""
+        if not self.running():
+            self._tasks = []
+            return
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key, fn, *args) -> bool:
+        """Queue `await fn(*args)` behind earlier events for `key`."""
+        if not self.running():
+            self.start()
+        pending = self._queues.get(key)
+        if pending is None:
+            self._queues[key] = deque([(fn, args)])
+            self._ready.put_nowait(key)
+            return True
+        if len(pending) >= self.max_pending:
+            return False
+        pending.append((fn, args))
+        return True
+
+    def pending(self, key) -> int:
+        return len(self._queues.get(key, ()))
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            try:
+                pending = self._queues[key]
+                for _ in range(BATCH):
+                    if not pending:
+                        break
+                    fn, args = pending[0]
+                    try:
+                        await fn(*args)
+                    except Exception:
+                        traceback.print_exc()
+                    pending.popleft()
+                if pending:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._queues[key]
+            finally:
+                self._ready.task_done()
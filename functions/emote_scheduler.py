@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import itertools
+import time
+import traceback
+
+from highrise import ResponseError
+
+# === User emote loop scheduler ===
+# One task drives every user's emote loop from a heap of monotonic deadlines.
+# Each loop fires at start + k * duration regardless of how long the send
+# took, so loops don't drift. Pausing, resuming and stopping only change the
+# loop's state; heap entries left behind by a restart or stop are recognised
+# by their generation number and skipped.
+#
+# In group mode, users looping the same emote share one cohort (and one heap
+# entry) and are all sent the emote on the cohort's tick, so they move in
+# sync. Sends run concurrently, at most MAX_CONCURRENT_SENDS at a time.
+
+MAX_CONCURRENT_SENDS = 10
+
+
+class EmoteScheduler:
+    def __init__(self, bot):
+        self.bot = bot
+        self.loops = {}         # user_id -> {"paused", "emote_id", "duration", "deadline", "gen", "group"}
+        self.cohorts = {}       # emote_id -> {"emote_id", "duration", "deadline", "gen", "members"}
+        self.group_mode = False
+        self._heap = []         # (deadline, gen, user_id | ("group", emote_id))
+        self._gen = itertools.count()
+        self._sends = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+        self._batches = set()   # send batches still running
+        self._wake = None
+        self._task = None
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self.loops
+
+    def get(self, user_id):
+        return self.loops.get(user_id)
+
+    # === State changes ===
+    def start(self, user_id: str, emote_id: str, duration: float, paused: bool = False):
+        """
+        Start (or replace) a user's loop. A solo loop sends its first emote
+        right away; in group mode the user joins the emote's cohort and is
+        picked up on its next tick.
+        """
+        self.stop(user_id)
+        state = {
+            "paused": paused,
+            "emote_id": emote_id,
+            "duration": duration,
+            "deadline": None,
+            "gen": None,
+            "group": self.group_mode,
+        }
+        self.loops[user_id] = state
+        if self.group_mode:
+            cohort = self.cohorts.get(emote_id)
+            if cohort is None:
+                cohort = self.cohorts[emote_id] = {
+                    "emote_id": emote_id,
+                    "duration": duration,
+                    "deadline": time.monotonic(),
+                    "gen": next(self._gen),
+                    "members": set(),
+                }
+                self._push(cohort["deadline"], cohort["gen"], ("group", emote_id))
+            cohort["members"].add(user_id)
+            state["deadline"] = cohort["deadline"]
+        else:
+            state["gen"] = next(self._gen)
+            state["deadline"] = time.monotonic()
+            self._push(state["deadline"], state["gen"], user_id)
+
+    def stop(self, user_id: str) -> bool:
+        state = self.loops.pop(user_id, None)
+        if state is None:
+            return False
+        if state["group"]:
+            cohort = self.cohorts.get(state["emote_id"])
+            if cohort is not None:
+                cohort["members"].discard(user_id)
+                if not cohort["members"]:
+                    del self.cohorts[state["emote_id"]]
+        return True
+
+    def pause(self, user_id: str):
+        state = self.loops.get(user_id)
+        if state:
+            state["paused"] = True
+
+    def resume(self, user_id: str):
+        state = self.loops.get(user_id)
+        if state:
+            state["paused"] = False
+
+    def set_group_mode(self, enabled: bool):
+        """Switch modes, moving every running loop into (or out of) cohorts."""
+        if enabled == self.group_mode:
+            return
+        self.group_mode = enabled
+        for user_id, state in list(self.loops.items()):
+            self.start(user_id, state["emote_id"], state["duration"], state["paused"])
+
+    # === Runner ===
+    def _push(self, deadline: float, gen: int, user_id: str):
+        heapq.heappush(self._heap, (deadline, gen, user_id))
+        self.ensure_running()
+        if self._heap[0][1] == gen:
+            self._wake.set()
+
+    def ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        """Stop the runner task; loop state is kept for the next ensure_running()."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if not self._heap:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                due = self._pop_due(time.monotonic())
+                if due:
+                    await self._fire(due)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+
+    def _pop_due(self, now: float) -> list:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, gen, key = heapq.heappop(self._heap)
+            if isinstance(key, tuple):
+                entry = self.cohorts.get(key[1])
+            else:
+                entry = self.loops.get(key)
+            if entry is None or entry["gen"] != gen:
+                continue  # stopped or restarted since this entry was queued
+            # Next deadline is a whole number of durations after the last
+            # one, skipping any slots that were missed entirely.
+            step = entry["duration"]
+            nxt = deadline + step
+            if nxt <= now:
+                nxt += ((now - nxt) // step + 1) * step
+            entry["deadline"] = nxt
+            heapq.heappush(self._heap, (nxt, gen, key))
+            if isinstance(key, tuple):
+                for user_id in entry["members"]:
+                    state = self.loops[user_id]
+                    if not state["paused"]:
+                        due.append((user_id, state))
+            elif not entry["paused"]:
+                due.append((key, entry))
+        return due
+
+    async def _fire(self, due: list):
+        highrise = getattr(self.bot, "highrise", None)
+        if not (highrise and highrise.ws and not highrise.ws.closed):
+            return
+        roster = self.bot.roster
+        targets = []
+        for user_id, state in due:
+            if user_id not in roster:
+                self.stop(user_id)
+            else:
+                targets.append((user_id, state))
+        if targets:
+            # Not awaited: a slow batch must not hold back the next deadlines.
+            task = asyncio.create_task(self._send_batch(targets))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _send_batch(self, targets: list):
+        await asyncio.gather(*(self._send(user_id, state) for user_id, state in targets))
+
+    async def _send(self, user_id: str, state: dict):
+        async with self._sends:
+            try:
+                await self.bot.outbound.emote(state["emote_id"], user_id)
+            except ResponseError as e:
+                if "Target user not in room" in str(e):
+                    if self.loops.get(user_id) is state:
+                        self.stop(user_id)
+                else:
+                    traceback.print_exc()
+            except Exception:
+                traceback.print_exc()
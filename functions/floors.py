@@ -1,15 +1,12 @@
 # functions/floors.py
 
-import json
 import re
 from highrise import Position
-from functions.data_store import get_path
+from functions import data_store
 from functions.data_store import is_owner
 
-FLOOR_FILE = get_path("floors")
-
 # Max floors
-MAX_FLOORS = 5
+MAX_FLOORS = 20
 
 # Data structures
 floor_data = {
@@ -18,34 +15,55 @@ floor_data = {
     "invites": {}      # slot -> [username1, username2]
 }
 
+# Teleport triggers for every saved floor, rebuilt whenever floors change
+floor_triggers = {}    # lowercase trigger -> ("public" | "vip", slot)
+
+def _slot_triggers(slot: str) -> list[str]:
+    m = re.fullmatch(r"(f|vip)(\d+)", slot)
+    if not m:
+        return [slot.lower()]
+    kind, num = m.groups()
+    if kind == "f":
+        return [f"f{num}", f"f {num}", f"floor{num}", f"floor {num}"]
+    return [f"vip{num}", f"vip {num}"]
+
+def rebuild_floor_triggers():
+    triggers = {}
+    for kind in ("public", "vip"):
+        for slot in floor_data[kind]:
+            for trigger in _slot_triggers(slot):
+                triggers.setdefault(trigger, (kind, slot))
+    # Updated in place: the command router holds a reference to this dict.
+    floor_triggers.clear()
+    floor_triggers.update(triggers)
+
 # Load existing
-try:
-    with open(FLOOR_FILE, "r", encoding="utf-8") as f:
-        floor_data.update(json.load(f))
-except Exception:
-    pass
+floor_data.update(data_store.load_floors())
+rebuild_floor_triggers()
 
 def save_floors():
-    with open(FLOOR_FILE, "w", encoding="utf-8") as f:
-        json.dump(floor_data, f, indent=2, ensure_ascii=False)
+    data_store.save_floors(floor_data)
 
 # === Save floor ===
 def set_floor(slot: str, pos: Position):
     floor_data["public"][slot] = {
         "x": pos.x, "y": pos.y, "z": pos.z, "facing": pos.facing
     }
+    rebuild_floor_triggers()
     save_floors()
 
 def set_vip_floor(slot: str, pos: Position):
     floor_data["vip"][slot] = {
         "x": pos.x, "y": pos.y, "z": pos.z, "facing": pos.facing
     }
+    rebuild_floor_triggers()
     save_floors()
 
 # === Reset ===
 def reset_floor(slot: str):
     if slot in floor_data["public"]:
         del floor_data["public"][slot]
+        rebuild_floor_triggers()
         save_floors()
 
 def reset_vip_floor(slot: str):
@@ -53,6 +71,7 @@ def reset_vip_floor(slot: str):
         del floor_data["vip"][slot]
     if slot in floor_data["invites"]:
         del floor_data["invites"][slot]
+    rebuild_floor_triggers()
     save_floors()
 
 # === Invite system ===
@@ -77,36 +96,34 @@ async def handle_floor_commands(bot, user, message: str) -> bool:
             num = trigger.replace("!setf", "").strip()
             if num.isdigit() and 1 <= int(num) <= MAX_FLOORS:
                 slot = f"f{num}"
-                room_users = await bot.highrise.get_room_users()
-                for u, pos in room_users.content:
-                    if u.username == user.username:
-                        set_floor(slot, pos)
-                        await bot.highrise.send_whisper(user.id, f"✅ Saved floor `{slot}`.")
-                        return True
+                pos = bot.roster.get_position(user.id)
+                if pos is not None:
+                    set_floor(slot, pos)
+                    await bot.send_safe_whisper(user.id, f"✅ Saved floor `{slot}`.")
+                    return True
 
         if trigger.startswith("!setvipf"):
             num = trigger.replace("!setvipf", "").strip()
             if num.isdigit() and 1 <= int(num) <= MAX_FLOORS:
                 slot = f"vip{num}"
-                room_users = await bot.highrise.get_room_users()
-                for u, pos in room_users.content:
-                    if u.username == user.username:
-                        set_vip_floor(slot, pos)
-                        await bot.highrise.send_whisper(user.id, f"✅ Saved VIP floor `{slot}`.")
-                        return True
+                pos = bot.roster.get_position(user.id)
+                if pos is not None:
+                    set_vip_floor(slot, pos)
+                    await bot.send_safe_whisper(user.id, f"✅ Saved VIP floor `{slot}`.")
+                    return True
 
         if trigger.startswith("!resetf"):
             num = trigger.replace("!resetf", "").strip()
             slot = f"f{num}"
             reset_floor(slot)
-            await bot.highrise.send_whisper(user.id, f"🧹 Reset floor `{slot}`.")
+            await bot.send_safe_whisper(user.id, f"🧹 Reset floor `{slot}`.")
             return True
 
         if trigger.startswith("!resetvipf"):
             num = trigger.replace("!resetvipf", "").strip()
             slot = f"vip{num}"
             reset_vip_floor(slot)
-            await bot.highrise.send_whisper(user.id, f"🧹 Reset VIP floor `{slot}`.")
+            await bot.send_safe_whisper(user.id, f"🧹 Reset VIP floor `{slot}`.")
             return True
 
         if trigger.startswith("!invitevip"):
@@ -117,32 +134,27 @@ async def handle_floor_commands(bot, user, message: str) -> bool:
                 if num.isdigit() and 1 <= int(num) <= MAX_FLOORS and mentions:
                     slot = f"vip{num}"
                     invite_to_vip(slot, mentions)
-                    await bot.highrise.send_whisper(user.id, f"🎟️ Invited to `{slot}`: " + ", ".join(mentions))
+                    await bot.send_safe_whisper(user.id, f"🎟️ Invited to `{slot}`: " + ", ".join(mentions))
                     return True
 
-    # === Teleport commands (public floors) ===
-    for i in range(1, MAX_FLOORS + 1):
-        slot = f"f{i}"
-        triggers = [
-            f"f{i}", f"f {i}", f"floor{i}", f"floor {i}",
-            f"F{i}", f"F {i}", f"FLOOR{i}", f"FLOOR {i}"
-        ]
-        if trigger in triggers and slot in floor_data["public"]:
+    # === Teleport commands ===
+    target = floor_triggers.get(trigger)
+    if target:
+        kind, slot = target
+        if kind == "public":
             await bot.highrise.teleport(user.id, Position(**floor_data["public"][slot]))
-            return True
-
-    # === Teleport commands (vip floors) ===
-    for i in range(1, MAX_FLOORS + 1):
-        slot = f"vip{i}"
-        triggers = [
-            f"vip{i}", f"vip {i}", f"VIP{i}", f"VIP {i}", f"Vip{i}", f"Vip {i}"
-        ]
-        if trigger in triggers:
-            if slot in floor_data["vip"]:
-                if is_owner(user.username) or is_user_invited(slot, user.username):
-                    await bot.highrise.teleport(user.id, Position(**floor_data["vip"][slot]))
-                else:
-                    await bot.highrise.send_whisper(user.id, "⛔ You are not invited to this VIP floor.")
-                return True
-
-    return False
\ No newline at end of file
+        elif is_owner(user.username) or is_user_invited(slot, user.username):
+            await bot.highrise.teleport(user.id, Position(**floor_data["vip"][slot]))
+        else:
+            await bot.send_safe_whisper(user.id, "⛔ You are not invited to this VIP floor.")
+        return True
+
+    return False
+
+def register_floor_commands(router):
+    router.register_table(floor_triggers, handle_floor_commands, category="floor")
+    router.register(
+        handle_floor_commands,
+        prefixes=("!setf", "!setvipf", "!resetf", "!resetvipf", "!invitevip"),
+        category="owner",
+    )
\ No newline at end of file
@@ -1,10 +1,39 @@
+import asyncio
 import json
 import os
 import threading
+import time
 import traceback
 
+from functions import data_store, persistence, rank_snapshot
+from functions.rank_index import RankIndex
+
 lock = threading.Lock()
 DATA_PATH = "data/ranks.json"
+JOURNAL_PATH = "data/ranks.journal"
+BINARY_PATH = "data/ranks.bin"
+
+# Snapshot format for the JSON backend: "json" (ranks.json) or "binary"
+# (ranks.bin, see functions/rank_snapshot.py). Reads use whichever of the two
+# files is newer, so switching formats either way keeps the latest stats
+# until the first snapshot in the new format has been written.
+SNAPSHOT_FORMAT = os.environ.get("KYBOT_RANKS_FORMAT", "json").lower()
+
+# Write-behind flushing: dirty stats are written out once FLUSH_INTERVAL
+# seconds have passed or FLUSH_MAX_DIRTY users changed, whichever comes first.
+FLUSH_INTERVAL = 5
+FLUSH_MAX_DIRTY = 500
+
+# Flushes append one record per changed user to the journal; once it holds
+# COMPACT_RECORDS records it is folded into a fresh ranks.json snapshot.
+COMPACT_RECORDS = 20000
+
+# The combined champion ranking depends on every user's position, so it is
+# rebuilt from the rank indexes at most once per CHAMPION_REFRESH seconds, by
+# a background task that hands the event loop back every CHAMPION_SLICE
+# users; lookups keep using the previous ranking until it is done.
+CHAMPION_REFRESH = 30
+CHAMPION_SLICE = 2000
 
 # Titles for ranks 1-10
 rank_titles = [
@@ -13,43 +42,294 @@ rank_titles = [
 ]
 CHAMPION_TITLES = {i + 1: title for i, title in enumerate(rank_titles)}
 
-def load_data():
+# === Resident stats store ===
+_data = None            # user_id -> {"username", "messages", "time"}
+_dirty = set()          # user ids changed since the last flush
+_last_flush = time.monotonic()
+_journal_records = 0
+
+# === Rank indexes ===
+_seq = {}               # user_id -> first-seen order, used to break ties
+_name_index = {}        # lowercase username -> user_id
+_msg_index = RankIndex()
+_time_index = RankIndex()
+_version = 0            # bumped whenever any score changes
+_champion_ranks = {}    # user_id -> room rank
+_champion_order = []    # user ids by room rank
+_champion_version = -1
+_champion_built = 0.0
+_champion_job = None    # background rebuild task
+
+# === Leaderboard view cache ===
+LEADERBOARD_SIZE = 10
+SHORT_TITLES = {
+    1: "Lgd", 2: "Rlr", 3: "Mstr", 4: "Cqr", 5: "Vtr",
+    6: "Icn", 7: "Pdg", 8: "Str", 9: "Hro", 10: "Pnr"
+}
+_views = {}             # category -> rendered leaderboard text
+_view_members = {}      # category -> user ids shown in the cached view
+_view_cutoff = {}       # category -> score a user needs to enter the cached view
+_champion_view_version = -1
+
+def _snapshot_path():
+    """The newer of ranks.bin and ranks.json, or None if neither exists."""
+    paths = [path for path in (BINARY_PATH, DATA_PATH) if os.path.exists(path)]
+    if SNAPSHOT_FORMAT != "binary":
+        paths.reverse()  # on equal timestamps prefer the configured format
+    return max(paths, key=os.path.getmtime, default=None)
+
+def _load_snapshot():
+    path = _snapshot_path()
+    if path is None:
+        return {}
+    if path == BINARY_PATH:
+        return rank_snapshot.load_snapshot(path)
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _read_snapshot():
     try:
         with lock:
-            if not os.path.exists(DATA_PATH):
-                return {}
-            with open(DATA_PATH, "r") as f:
-                return json.load(f)
+            return _load_snapshot()
     except Exception:
         traceback.print_exc()
         return {}
 
-def save_data(data):
+def _replay_journal(data):
+    """
+    Apply journal records on top of the snapshot; returns the record count.
+    A torn last line from a crash mid-append is cut off the file, so the
+    next append starts on a fresh line instead of being glued to it.
+    """
+    count = 0
     try:
         with lock:
-            os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
-            with open(DATA_PATH, "w") as f:
-                json.dump(data, f, indent=2)
+            if not os.path.exists(JOURNAL_PATH):
+                return 0
+            with open(JOURNAL_PATH, "rb+") as f:
+                raw = f.read()
+                end = raw.rfind(b"\n") + 1
+                if end < len(raw):
+                    f.truncate(end)
+            lines = raw[:end].decode("utf-8", errors="replace").splitlines()
     except Exception:
         traceback.print_exc()
+        return 0
+
+    for line in lines:
+        try:
+            user_id, username, messages, seconds = json.loads(line)
+        except Exception:
+            continue  # damaged line; skip it rather than lose the rest
+        record = data.setdefault(user_id, {})
+        record.update(username=username, messages=messages, time=seconds)
+        count += 1
+    return count
+
+def _read_file():
+    global _journal_records
+    if data_store.BACKEND != "sqlite":
+        data = _read_snapshot()
+        _journal_records = _replay_journal(data)
+        return data
+    data = data_store.load_ranks_data()
+    if not data and _snapshot_path() is not None:
+        # First run on the sqlite backend: import the existing snapshot.
+        data = _read_snapshot()
+        _replay_journal(data)
+        data_store.save_rank_rows(data)
+    return data
+
+def _append_text(path, text):
+    with lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+def _replace_snapshot(path, data):
+    with lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path == BINARY_PATH:
+            rank_snapshot.write_snapshot(path, data)
+        else:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                # json.dump streams through the pure-Python encoder, so the
+                # event loop thread still gets the GIL between chunks.
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        open(JOURNAL_PATH, "w").close()
+
+def _compact_journal():
+    """
+    Fold the journal into a fresh snapshot. Runs on the persistence thread
+    after every append queued before it, rebuilding the stats from the files
+    so the resident dict is never read off the event loop.
+    """
+    try:
+        with lock:
+            data = _load_snapshot()
+    except Exception:
+        traceback.print_exc()
+        return  # keep the journal rather than fold it into a damaged snapshot
+    _replay_journal(data)
+    _replace_snapshot(BINARY_PATH if SNAPSHOT_FORMAT == "binary" else DATA_PATH, data)
+
+def _append_journal(data, user_ids):
+    global _journal_records
+    lines = []
+    for uid in user_ids:
+        record = data.get(uid)
+        if record is not None:
+            lines.append(json.dumps(
+                [uid, record.get("username", ""), record.get("messages", 0), record.get("time", 0)],
+                ensure_ascii=False, separators=(",", ":"),
+            ) + "\n")
+    persistence.submit(_append_text, JOURNAL_PATH, "".join(lines))
+    _journal_records += len(lines)
+
+def _write_snapshot(data):
+    """Replace the snapshot with a copy of `data` taken now."""
+    global _journal_records
+    data = {uid: dict(record) for uid, record in data.items()}
+    path = BINARY_PATH if SNAPSHOT_FORMAT == "binary" else DATA_PATH
+    persistence.submit(_replace_snapshot, path, data)
+    _journal_records = 0
+
+def _compact():
+    global _journal_records
+    persistence.submit(_compact_journal)
+    _journal_records = 0
+
+def _write_file(data, user_ids=None):
+    """
+    Persist `data`. With `user_ids` only those users are written: a journal
+    append on the JSON backend, row upserts on sqlite. Without it the whole
+    dataset is written as a new snapshot.
+    """
+    try:
+        if data_store.BACKEND == "sqlite":
+            if user_ids is None:
+                data_store.save_ranks_data(data)
+            else:
+                data_store.save_rank_rows({uid: data[uid] for uid in user_ids if uid in data})
+            return True
+        if user_ids is None:
+            _write_snapshot(data)
+        else:
+            _append_journal(data, user_ids)
+            if _journal_records >= COMPACT_RECORDS:
+                _compact()
+        return True
+    except Exception:
+        traceback.print_exc()
+        return False
+
+def _rebuild_indexes(data):
+    global _version
+    _seq.clear()
+    _name_index.clear()
+    for user_id, record in data.items():
+        _seq[user_id] = len(_seq)
+        _name_index.setdefault(str(record.get("username", "")).lower(), user_id)
+    _msg_index.build((uid, u.get("messages", 0), _seq[uid]) for uid, u in data.items())
+    _time_index.build((uid, u.get("time", 0), _seq[uid]) for uid, u in data.items())
+    _version += 1
+    _views.clear()
+
+def load_data():
+    """Return the resident stats dict, reading ranks.json on first use."""
+    global _data
+    if _data is None:
+        _data = _read_file()
+        _rebuild_indexes(_data)
+    return _data
+
+def save_data(data):
+    """Replace the resident stats with `data` and write them out immediately."""
+    global _data, _last_flush
+    _data = data
+    _rebuild_indexes(data)
+    if _write_file(data):
+        _dirty.clear()
+        _last_flush = time.monotonic()
+
+def flush_data(force=False):
+    """Write dirty stats to disk if forced or the flush thresholds are reached."""
+    global _last_flush
+    if not _dirty:
+        return False
+    if not force and len(_dirty) < FLUSH_MAX_DIRTY and time.monotonic() - _last_flush < FLUSH_INTERVAL:
+        return False
+    if _write_file(load_data(), _dirty):
+        _dirty.clear()
+        _last_flush = time.monotonic()
+        return True
+    return False
+
+def compact_data():
+    """
+    Flush pending stats. On the JSON backend the journal is then folded into
+    a fresh snapshot; sqlite rows are upserted in place, so there is no more to do.
+    """
+    if _data is None:
+        return
+    flush_data(force=True)
+    if data_store.BACKEND != "sqlite":
+        _compact()
+
+def _apply_stats(user_id, username, data, inc_msg=False, inc_time=0):
+    global _version
+    user_id = str(user_id)
+
+    record = data.get(user_id)
+    if record is None:
+        record = data[user_id] = {"username": username, "messages": 0, "time": 0}
+        _seq.setdefault(user_id, len(_seq))
+        _name_index[username.lower()] = user_id
+        _msg_index.update(user_id, 0, _seq[user_id])
+        _time_index.update(user_id, 0, _seq[user_id])
+        _version += 1
+    elif record["username"] != username:
+        old_name = str(record["username"]).lower()
+        if _name_index.get(old_name) == user_id:
+            del _name_index[old_name]
+        _name_index[username.lower()] = user_id
+        record["username"] = username
+        _invalidate_views(user_id)
+
+    if inc_msg:
+        record["messages"] += 1
+        _msg_index.update(user_id, record["messages"], _seq[user_id])
+        _invalidate_views(user_id, 1, record["messages"])
+        _version += 1
+    if inc_time > 0:
+        record["time"] += inc_time
+        _time_index.update(user_id, record["time"], _seq[user_id])
+        _invalidate_views(user_id, 2, record["time"])
+        _version += 1
+
+    _dirty.add(user_id)
 
 def update_user_stats(user_id, username, data=None, inc_msg=False, inc_time=0):
     try:
-        user_id = str(user_id)
         if data is None:
             data = load_data()
+        _apply_stats(user_id, username, data, inc_msg=inc_msg, inc_time=inc_time)
+        flush_data()
+    except Exception:
+        traceback.print_exc()
 
-        if user_id not in data:
-            data[user_id] = {"username": username, "messages": 0, "time": 0}
-        else:
-            data[user_id]["username"] = username
-
-        if inc_msg:
-            data[user_id]["messages"] += 1
-        if inc_time > 0:
-            data[user_id]["time"] += inc_time
-
-        save_data(data)
+def add_user_times(entries):
+    """Credit room time in bulk from (user_id, username, seconds) entries."""
+    try:
+        data = load_data()
+        for user_id, username, seconds in entries:
+            if seconds > 0:
+                _apply_stats(user_id, username, data, inc_time=seconds)
+        flush_data()
     except Exception:
         traceback.print_exc()
 
@@ -78,6 +358,114 @@ def format_compact_time(seconds: int) -> str:
     except Exception:
         return "0m"
 
+def find_user_id(username: str):
+    """Case-insensitive username -> user_id lookup for ranked users."""
+    load_data()
+    return _name_index.get(username.lower())
+
+def _champion_steps(msg_keys, time_keys, order, ranks):
+    """
+    Fill `order` and `ranks` from copies of the message and time index keys,
+    yielding every CHAMPION_SLICE users so a caller can let other work run.
+    Users are counting-sorted by combined position, ties by first-seen order,
+    without allocating any per-user object the garbage collector tracks.
+    """
+    time_ranks = {}
+    for i, key in enumerate(time_keys, 1):
+        time_ranks[key[2]] = i
+        if i % CHAMPION_SLICE == 0:
+            yield
+    starts = [0] * (len(msg_keys) + max(len(time_keys), 9999) + 2)
+    scores, uids, last_seq = {}, {}, -1
+    for i, (_, seq, uid) in enumerate(msg_keys, 1):
+        score = scores[seq] = i + time_ranks.get(uid, 9999)
+        uids[seq] = uid
+        starts[score + 1] += 1
+        last_seq = max(last_seq, seq)
+        if i % CHAMPION_SLICE == 0:
+            yield
+    for i in range(1, len(starts)):
+        starts[i] += starts[i - 1]
+        if i % CHAMPION_SLICE == 0:
+            yield
+    order.extend([None] * len(msg_keys))
+    for seq in range(last_seq + 1):
+        score = scores.get(seq)
+        if score is not None:
+            order[starts[score]] = uids[seq]
+            starts[score] += 1
+        if seq % CHAMPION_SLICE == CHAMPION_SLICE - 1:
+            yield
+    for i, uid in enumerate(order, 1):
+        ranks[uid] = i
+        if i % CHAMPION_SLICE == 0:
+            yield
+
+def _install_champion(order, ranks, version):
+    global _champion_ranks, _champion_order, _champion_version, _champion_built
+    _champion_order, _champion_ranks = order, ranks
+    _champion_version = version
+    _champion_built = time.monotonic()
+
+def _build_champion():
+    order, ranks = [], {}
+    for _ in _champion_steps(_msg_index.keys(), _time_index.keys(), order, ranks):
+        pass
+    _install_champion(order, ranks, _version)
+
+async def _rebuild_champion_slices():
+    try:
+        version = _version
+        order, ranks = [], {}
+        for _ in _champion_steps(_msg_index.keys(), _time_index.keys(), order, ranks):
+            await asyncio.sleep(0)
+        _install_champion(order, ranks, version)
+    except Exception:
+        traceback.print_exc()
+
+def _rebuild_champion():
+    """Start a background rebuild unless one is already running on this loop."""
+    global _champion_job
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _build_champion()
+        return
+    if _champion_job is not None and not _champion_job.done() and _champion_job.get_loop() is loop:
+        return
+    _champion_job = loop.create_task(_rebuild_champion_slices())
+
+def _champion_ranking(force=False):
+    """
+    Room ranks by combined message + time position. Never rebuilds inline:
+    a stale (or, with `force`, any outdated) ranking is refreshed in the
+    background and the current one is returned meanwhile.
+    """
+    load_data()
+    if _champion_version != _version:
+        if force or _champion_version < 0 or time.monotonic() - _champion_built >= CHAMPION_REFRESH:
+            _rebuild_champion()
+    return _champion_order, _champion_ranks
+
+def warm_ranks():
+    """
+    Load the stats and build the champion ranking ahead of the first lookup;
+    only the very first build runs inline, later calls refresh in the background.
+    """
+    if _champion_version < 0:
+        load_data()
+        _build_champion()
+    else:
+        _champion_ranking(force=True)
+
+def get_room_rank(user_id: str):
+    """
+    Room rank from the cached champion ranking, without forcing a rebuild;
+    users added since the last refresh are unranked (None) until the next one.
+    """
+    _, champion_ranks = _champion_ranking()
+    return champion_ranks.get(str(user_id))
+
 def get_user_rank(user_id: str):
     try:
         data = load_data()
@@ -85,18 +473,16 @@ def get_user_rank(user_id: str):
         if user_id not in data:
             return None
 
-        sorted_msg = sorted(data.items(), key=lambda x: x[1].get('messages', 0), reverse=True)
-        sorted_time = sorted(data.items(), key=lambda x: x[1].get('time', 0), reverse=True)
-
-        msg_rank = next((i + 1 for i, (uid, _) in enumerate(sorted_msg) if uid == user_id), None)
-        time_rank = next((i + 1 for i, (uid, _) in enumerate(sorted_time) if uid == user_id), None)
-
-        msg_ranks = {uid: i + 1 for i, (uid, _) in enumerate(sorted_msg)}
-        time_ranks = {uid: i + 1 for i, (uid, _) in enumerate(sorted_time)}
+        msg_rank = _msg_index.rank(user_id)
+        time_rank = _time_index.rank(user_id)
 
-        combined_scores = {uid: msg_ranks.get(uid, 9999) + time_ranks.get(uid, 9999) for uid in data.keys()}
-        combined_sorted = sorted(combined_scores.items(), key=lambda x: x[1])
-        room_rank = next((i + 1 for i, (uid, _) in enumerate(combined_sorted) if uid == user_id), None)
+        # Users added since the last rebuild get a provisional rank behind
+        # everyone already ranked until the background refresh catches up.
+        _, champion_ranks = _champion_ranking()
+        room_rank = champion_ranks.get(user_id)
+        if room_rank is None:
+            _champion_ranking(force=True)
+            room_rank = len(champion_ranks) + 1
 
         title = CHAMPION_TITLES.get(room_rank, f"#{room_rank}" if room_rank else None)
 
@@ -110,6 +496,62 @@ def get_user_rank(user_id: str):
         traceback.print_exc()
         return None
 
+def _invalidate_views(user_id, category=None, score=None):
+    """Drop cached views that show `user_id` or that `score` could now enter."""
+    for cat in [category] if category else list(_views):
+        if cat not in _views:
+            continue
+        if user_id in _view_members[cat] or (score is not None and score >= _view_cutoff[cat]):
+            del _views[cat]
+
+def _render_view(category: int) -> str:
+    global _champion_view_version
+    data = load_data()
+    if category == 1:
+        label = "🗣️ Most Talkative"
+        top = _msg_index.top(LEADERBOARD_SIZE)
+        values = [format_compact_number(data[uid].get("messages", 0)) for uid in top]
+        scores = [data[uid].get("messages", 0) for uid in top]
+    elif category == 2:
+        label = "⏱️ Longest Stay"
+        top = [uid for uid in _time_index.top(LEADERBOARD_SIZE) if data[uid].get("time", 0) > 0]
+        values = [format_compact_time(data[uid].get("time", 0)) for uid in top]
+        scores = [data[uid].get("time", 0) for uid in top]
+    else:
+        label = "👑 Room Champions"
+        order, _ = _champion_ranking()
+        top = order[:LEADERBOARD_SIZE]
+        values = scores = None
+
+    lines = [f"🏆 {label}:"]
+    for i, uid in enumerate(top, 1):
+        name = data[uid].get("username", f"User{i}")
+        if category == 3:
+            lines.append(f"{i}. 👑{SHORT_TITLES.get(i, f'#{i}')} @{name}")
+        else:
+            lines.append(f"{i}. @{name} - {values[i - 1]}")
+
+    _view_members[category] = set(top)
+    if category == 3:
+        _champion_view_version = _champion_version
+        _view_cutoff[category] = float("inf")
+    elif len(top) < LEADERBOARD_SIZE:
+        _view_cutoff[category] = 1 if category == 2 else 0
+    else:
+        _view_cutoff[category] = scores[-1]
+    return "\n".join(lines)
+
+def get_leaderboard_view(category: int) -> str:
+    """Rendered top-10 text for a category, served from cache when unchanged."""
+    view = _views.get(category)
+    if category == 3:
+        _champion_ranking()
+        if view is not None and _champion_view_version != _champion_version:
+            view = None
+    if view is None:
+        view = _views[category] = _render_view(category)
+    return view
+
 async def handle_leaderboard_command(message: str, user, whisper_fn, chat_fn, is_owner_fn):
     try:
         cmd = message.lower().strip()
@@ -121,28 +563,14 @@ async def handle_leaderboard_command(message: str, user, whisper_fn, chat_fn, is
         arg = parts[1] if len(parts) > 1 else ""
 
         data = load_data()
-        sorted_msg = sorted(data.items(), key=lambda x: x[1].get("messages", 0), reverse=True)
-        sorted_time = sorted(data.items(), key=lambda x: x[1].get("time", 0), reverse=True)
-
-        def get_champion_sorted():
-            try:
-                msg_ranks = {uid: i + 1 for i, (uid, _) in enumerate(sorted_msg)}
-                time_ranks = {uid: i + 1 for i, (uid, _) in enumerate(sorted_time)}
-                scores = {uid: msg_ranks.get(uid, 9999) + time_ranks.get(uid, 9999) for uid in data}
-                sorted_combined = sorted(scores.items(), key=lambda x: x[1])
-                return [(uid, data[uid]) for uid, _ in sorted_combined[:10]]
-            except Exception:
-                traceback.print_exc()
-                return []
 
         if command == "rank":
             mentioned_user = None
             if '@' in message:
                 mentioned_username = message.split('@')[-1].strip()
-                for uid, u in data.items():
-                    if u["username"].lower() == mentioned_username.lower():
-                        mentioned_user = {"id": uid, "username": u["username"]}
-                        break
+                uid = find_user_id(mentioned_username)
+                if uid is not None:
+                    mentioned_user = {"id": uid, "username": data[uid]["username"]}
 
             target = mentioned_user if mentioned_user else {"id": user.id, "username": user.username}
             rank_data = get_user_rank(target["id"])
@@ -171,36 +599,7 @@ async def handle_leaderboard_command(message: str, user, whisper_fn, chat_fn, is
                 await whisper_fn(user, "Only owners can use 'show'.")
                 return None, None
 
-            if cat == 1:
-                label = "🗣️ Most Talkative"
-                sorted_list = sorted_msg[:10]
-                formatter = lambda u: format_compact_number(u[1].get("messages", 0))
-                prefix = ""
-            elif cat == 2:
-                label = "⏱️ Longest Stay"
-                sorted_list = [(uid, udata) for uid, udata in sorted_time if udata.get("time", 0) > 0][:10]
-                formatter = lambda u: format_compact_time(u[1].get("time", 0))
-                prefix = ""
-            else:
-                label = "👑 Room Champions"
-                sorted_list = get_champion_sorted()
-                short_titles = {
-                    1: "Lgd", 2: "Rlr", 3: "Mstr", 4: "Cqr", 5: "Vtr",
-                    6: "Icn", 7: "Pdg", 8: "Str", 9: "Hro", 10: "Pnr"
-                }
-                prefix = "👑"
-
-            lines = [f"🏆 {label}:"]
-            for i, (uid, udata) in enumerate(sorted_list, 1):
-                name = udata.get("username", f"User{i}")
-                if cat == 3:
-                    title = short_titles.get(i, f"#{i}")
-                    lines.append(f"{i}. {prefix}{title} @{name}")
-                else:
-                    val = formatter((uid, udata))
-                    lines.append(f"{i}. @{name} - {val}")
-
-            message = "\n".join(lines)
+            message = get_leaderboard_view(cat)
 
             # If too long, split into multiple whispers
             if len(message) > 280:
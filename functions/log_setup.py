@@ -0,0 +1,110 @@
+import atexit
+import gzip
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+
+# === Logging ===
+# Callers only put records on a queue; a listener thread formats them and
+# does the console and file I/O. Chat lines go to the "kybot.chat" and
+# "kybot.whisper" loggers: they are always archived to logs/chat.log (rotated
+# at midnight, old files gzipped) but only every Nth one is echoed to the
+# console, so heavy chat does not flood stdout.
+
+LOG_LEVEL = os.environ.get("KYBOT_LOG_LEVEL", "INFO").upper()
+CHAT_LOG_PATH = "logs/chat.log"
+CHAT_LOG_DAYS = 30
+
+# logger: (level, echo 1 in N records to the console)
+LOG_CATEGORIES = {
+    "kybot.chat": ("INFO", int(os.environ.get("KYBOT_CHAT_SAMPLE", "1"))),
+    "kybot.whisper": ("INFO", 1),
+}
+
+_listener = None
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    # The stock handler formats the message in the calling thread. Records are
+    # passed through as-is instead and formatted by the listener, so callers
+    # must log immutable arguments (strings, numbers).
+    def prepare(self, record):
+        return record
+
+
+class _SampleFilter(logging.Filter):
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.counters = {name: itertools.count() for name, (_, every) in rates.items() if every > 1}
+        self.every = {name: every for name, (_, every) in rates.items()}
+
+    def filter(self, record):
+        counter = self.counters.get(record.name)
+        return counter is None or next(counter) % self.every[record.name] == 0
+
+
+class _CategoryFilter(logging.Filter):
+    def __init__(self, names):
+        super().__init__()
+        self.names = set(names)
+
+    def filter(self, record):
+        return record.name in self.names
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def setup_logging():
+    global _listener
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+    console.addFilter(_SampleFilter(LOG_CATEGORIES))
+    handlers = [console]
+
+    try:
+        os.makedirs(os.path.dirname(CHAT_LOG_PATH), exist_ok=True)
+        archive = logging.handlers.TimedRotatingFileHandler(
+            CHAT_LOG_PATH, when="midnight", backupCount=CHAT_LOG_DAYS, encoding="utf-8"
+        )
+        archive.namer = _gzip_namer
+        archive.rotator = _gzip_rotator
+        archive.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        archive.addFilter(_CategoryFilter(LOG_CATEGORIES))
+        handlers.append(archive)
+    except OSError:
+        logging.getLogger(__name__).warning("Chat archive disabled: cannot open %s", CHAT_LOG_PATH)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [_LazyQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    for name, (level, _) in LOG_CATEGORIES.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -1,11 +1,13 @@
 import asyncio
+import logging
 import traceback
 import json
 import os
 import random
 from highrise import BaseBot
 from highrise.models import User, Position, AnchorPosition
-from highrise import ResponseError
+from functions import outbound, persistence, reply_cache
+from functions.data_store import is_owner
 
 
 BOT_LOOP_FILE = "bot_emote_loop.json"
@@ -221,76 +223,98 @@ emote_list: list[tuple[list[str], str, float, bool]] = [
     (["218", "floss", "Flosss"], "dance-floss", 21.00, False),
     (["219", "break dance", "Breakdance"], "dance-breakdance", 17.00, False),
 ]
+
+# === Emote lookup tables ===
+# Built once at import so a chat message costs one dict lookup. When an alias
+# is shared by several emotes the first one in emote_list wins, as before.
+emote_by_alias = {}         # lowercase alias -> emote_list entry
+emote_by_id = {}            # emote id -> emote_list entry
+emote_alias_conflicts = {}  # lowercase alias -> emote ids that share it
+
+def _build_emote_index():
+    for entry in emote_list:
+        aliases, emote_id, _, _ = entry
+        emote_by_id.setdefault(emote_id, entry)
+        for alias in aliases:
+            key = alias.lower()
+            first = emote_by_alias.setdefault(key, entry)
+            if first is not entry and first[1] != emote_id:
+                ids = emote_alias_conflicts.setdefault(key, [first[1]])
+                if emote_id not in ids:
+                    ids.append(emote_id)
+    for alias, ids in emote_alias_conflicts.items():
+        logging.warning("Emote alias '%s' is shared by %s; using %s", alias, ", ".join(ids), ids[0])
+
+_build_emote_index()
+
+def find_emote(name: str):
+    return emote_by_alias.get(name.strip().lower())
+
+def render_emote_list() -> str:
+    names = [aliases[1].capitalize() for aliases, _, _, allowed in emote_list if allowed and len(aliases) > 1]
+    return ", ".join(names)
+
+# Invalidate "emote_list" after changing emote_list or its allowed flags.
+reply_cache.register("emote_list", render_emote_list)
+
 user_last_positions = {}
 
 def is_ws_connected(bot) -> bool:
     return hasattr(bot, "highrise") and bot.highrise.ws and not bot.highrise.ws.closed
 
-async def check_and_start_emote_loop(self: BaseBot, user: User, message: str):
+STOP_WORDS = ("stop", "/stop", "!stop", "-stop")
+
+async def check_and_start_emote_loop(self: BaseBot, user: User, message: str) -> bool:
     try:
         cleaned_msg = message.strip().lower()
 
-        if cleaned_msg in ("stop", "/stop", "!stop", "-stop"):
-            if user.id in self.user_loops:
-                self.user_loops[user.id]["task"].cancel()
-                del self.user_loops[user.id]
-                await self.highrise.send_whisper(user.id, "Emote loop stopped. (Type any emote name or number to start again)")
+        if cleaned_msg in STOP_WORDS:
+            if self.emote_scheduler.stop(user.id):
+                await self.send_safe_whisper(user.id, "Emote loop stopped. (Type any emote name or number to start again)")
             else:
-                await self.highrise.send_whisper(user.id, "You don't have an active emote loop.")
-            return
+                await self.send_safe_whisper(user.id, "You don't have an active emote loop.")
+            return True
 
-        selected = next((e for e in emote_list if cleaned_msg in [a.lower() for a in e[0]]), None)
+        selected = emote_by_alias.get(cleaned_msg)
         if selected:
             aliases, emote_id, duration, user_allowed = selected
             if not user_allowed:
-                return
+                return False
 
-            if user.id in self.user_loops:
-                self.user_loops[user.id]["task"].cancel()
-
-            async def emote_loop():
-                try:
-                    while True:
-                        if not self.user_loops[user.id]["paused"] and is_ws_connected(self):
-                            room_users = await self.highrise.get_room_users()
-                            user_ids = [u.id for u, _ in room_users.content]
-                            if user.id not in user_ids:
-                                self.user_loops[user.id]["task"].cancel()
-                                del self.user_loops[user.id]
-                                return
-                            try:
-                                await self.highrise.send_emote(emote_id, user.id)
-                            except ResponseError as re:
-                                if "Target user not in room" in str(re):
-                                    self.user_loops[user.id]["task"].cancel()
-                                    del self.user_loops[user.id]
-                                    return
-                                else:
-                                    raise
-                        await asyncio.sleep(duration)
-                except asyncio.CancelledError:
-                    pass
-                except Exception:
-                    traceback.print_exc()
-
-            task = asyncio.create_task(emote_loop())
-            self.user_loops[user.id] = {
-                "paused": False,
-                "emote_id": emote_id,
-                "duration": duration,
-                "task": task,
-            }
+            self.emote_scheduler.start(user.id, emote_id, duration)
 
             visible_name = aliases[1] if len(aliases) > 1 else aliases[0]
-            await self.highrise.send_whisper(
+            await self.send_safe_whisper(
                 user.id, f"You are now in a loop for emote: {visible_name}. (To stop, type 'stop')"
             )
+            return True
     except Exception:
         traceback.print_exc()
+    return False
+
+async def handle_group_mode_command(self: BaseBot, user: User, message: str) -> bool:
+    if not is_owner(user.username):
+        return False
+    arg = message.strip().lower()[len("!groupemote"):].strip()
+    if arg in ("on", "off"):
+        self.emote_scheduler.set_group_mode(arg == "on")
+    state = "on" if self.emote_scheduler.group_mode else "off"
+    await self.send_safe_whisper(user.id, f"💃 Group emote mode is {state}.")
+    return True
+
+def register_emote_commands(router):
+    router.register(check_and_start_emote_loop, exact=(*STOP_WORDS, *emote_by_alias), category="emote")
+    router.register(handle_group_mode_command, prefixes=("!groupemote",), category="owner")
+
+# A loop is paused while its user walks and resumed MOVE_RESUME_DELAY seconds
+# after their last move. Each user has at most one pending resume timer, which
+# every further move pushes back.
+MOVE_RESUME_DELAY = 2
+_resume_timers = {}    # user_id -> asyncio.TimerHandle
 
 async def handle_user_movement(self: BaseBot, user: User, pos) -> None:
     try:
-        if user.id not in self.user_loops:
+        if user.id not in self.emote_scheduler:
             return
 
         if isinstance(pos, Position):
@@ -301,23 +325,28 @@ async def handle_user_movement(self: BaseBot, user: User, pos) -> None:
                 return
 
             if old_pos != (pos.x, pos.y, pos.z):
-                self.user_loops[user.id]["paused"] = True
-                await asyncio.sleep(2)
-                new_pos = user_last_positions.get(user.id)
-                if new_pos == (pos.x, pos.y, pos.z):
-                    self.user_loops[user.id]["paused"] = False
+                self.emote_scheduler.pause(user.id)
+                timer = _resume_timers.get(user.id)
+                if timer is not None:
+                    timer.cancel()
+                _resume_timers[user.id] = asyncio.get_running_loop().call_later(
+                    MOVE_RESUME_DELAY, _resume_after_move, self, user.id
+                )
         elif isinstance(pos, AnchorPosition):
             user_last_positions[user.id] = None
     except Exception:
         traceback.print_exc()
 
+def _resume_after_move(self: BaseBot, user_id: str) -> None:
+    _resume_timers.pop(user_id, None)
+    self.emote_scheduler.resume(user_id)
+
 loop_file_path = "functions/bot_emote_loop.json"
 bot_loop_data = { "emotes": [], "mode": "order" }
 bot_loop_task = None
 
 def save_bot_loop():
-    with open(loop_file_path, "w") as f:
-        json.dump(bot_loop_data, f)
+    persistence.write_json(loop_file_path, bot_loop_data)
 
 def load_bot_loop():
     global bot_loop_data
@@ -339,19 +368,19 @@ async def handle_bot_emote_loop(self: BaseBot, user: User, message: str):
 
     if lower == "loop list":
         if not bot_loop_data["emotes"]:
-            await self.highrise.send_whisper(user.id, "Bot has no emotes saved.")
+            await self.send_safe_whisper(user.id, "Bot has no emotes saved.")
             return
         txt = "🤖 Bot Emote Loop:\n"
         for idx, emote in enumerate(bot_loop_data["emotes"], 1):
             txt += f"{idx}. {emote['emote_id']} - {emote['duration']:.1f}s\n"
-        await self.highrise.send_whisper(user.id, txt)
+        await self.send_safe_whisper(user.id, txt)
         return
 
     if lower.startswith("loopr "):
         target = lower.replace("loopr", "").strip()
         bot_loop_data["emotes"] = [e for e in bot_loop_data["emotes"] if e["emote_id"] != target]
         save_bot_loop()
-        await self.highrise.send_whisper(user.id, f"✅ Removed emote: {target}")
+        await self.send_safe_whisper(user.id, f"✅ Removed emote: {target}")
         return
 
     if lower.startswith("loop mode "):
@@ -359,23 +388,23 @@ async def handle_bot_emote_loop(self: BaseBot, user: User, message: str):
         if mode in ("random", "order"):
             bot_loop_data["mode"] = mode
             save_bot_loop()
-            await self.highrise.send_whisper(user.id, f"✅ Bot loop mode set to {mode}.")
+            await self.send_safe_whisper(user.id, f"✅ Bot loop mode set to {mode}.")
         else:
-            await self.highrise.send_whisper(user.id, "❌ Mode must be 'order' or 'random'.")
+            await self.send_safe_whisper(user.id, "❌ Mode must be 'order' or 'random'.")
         return
 
     if lower.startswith("loop "):
         emote_name = lower.replace("loop", "").strip()
-        selected = next((e for e in emote_list if emote_name in [a.lower() for a in e[0]]), None)
+        selected = find_emote(emote_name)
         if selected:
             _, emote_id, duration, _ = selected
             bot_loop_data["emotes"].append({"emote_id": emote_id, "duration": duration})
             save_bot_loop()
-            await self.highrise.send_whisper(user.id, f"✅ Bot will now loop: {emote_id}")
+            await self.send_safe_whisper(user.id, f"✅ Bot will now loop: {emote_id}")
             if not bot_loop_task or bot_loop_task.done():
                 bot_loop_task = asyncio.create_task(start_bot_loop(self))
         else:
-            await self.highrise.send_whisper(user.id, f"❌ Emote not recognized: {emote_name}")
+            await self.send_safe_whisper(user.id, f"❌ Emote not recognized: {emote_name}")
 
 async def start_bot_loop(self: BaseBot):
     global bot_loop_task
@@ -395,10 +424,7 @@ async def start_bot_loop(self: BaseBot):
             for emote in loop:
                 if not is_ws_connected(self):
                     break
-                try:
-                    await self.highrise.send_emote(emote["emote_id"])
-                except ResponseError:
-                    pass
+                self.outbound.emote(emote["emote_id"], priority=outbound.BACKGROUND)
                 await asyncio.sleep(emote["duration"])
     except asyncio.CancelledError:
         pass
@@ -412,6 +438,6 @@ async def stop_bot_emote_loop(self: BaseBot, user: User):
         bot_loop_task = None
         bot_loop_data["emotes"].clear()
         save_bot_loop()
-        await self.highrise.send_whisper(user.id, "🛑 Bot emote loop stopped.")
+        await self.send_safe_whisper(user.id, "🛑 Bot emote loop stopped.")
     else:
-        await self.highrise.send_whisper(user.id, "❌ No active bot loop to stop.")
\ No newline at end of file
+        await self.send_safe_whisper(user.id, "❌ No active bot loop to stop.")
\ No newline at end of file
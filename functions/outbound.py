@@ -0,0 +1,257 @@
+import asyncio
+import time
+import traceback
+from collections import deque
+
+from functions.rate_limit import TokenBucket
+
+# === Outbound message scheduler ===
+# Every chat, whisper and emote the bot sends goes through one queue so the
+# bot as a whole stays inside the server's send limits:
+#   * one shared token bucket (SEND_RATE / SEND_BURST) paces all sends, and
+#     room chat additionally keeps its own slower pace (CHAT_RATE);
+#   * lower priority numbers go first: owner replies before command replies,
+#     welcomes, room broadcasts, emotes and background whispers;
+#   * within a priority, destinations (a user's whispers, room chat, a user's
+#     emotes) take turns, so one long reply cannot starve other users;
+#   * messages to one destination are sent in order, one at a time, while up
+#     to MAX_IN_FLIGHT different destinations can be waiting on the server;
+#   * whispers wait COALESCE_WINDOW seconds before they can be sent, and any
+#     queued whispers to the same user and priority are merged and repacked
+#     into as few WHISPER_LIMIT chunks as possible.
+
+OWNER, REPLY, WELCOME, BROADCAST, EMOTE, BACKGROUND = range(6)
+PRIORITIES = (OWNER, REPLY, WELCOME, BROADCAST, EMOTE, BACKGROUND)
+
+SEND_RATE = 10.0
+SEND_BURST = 20
+CHAT_RATE = 1 / 1.5
+CHAT_BURST = 2
+MAX_IN_FLIGHT = 8
+IDLE_POLL = 0.05    # re-check interval while a free destination waits on the send rate
+COALESCE_WINDOW = 0.15
+
+WHISPER_LIMIT = 240
+CHAT_LIMIT = 400
+
+CHAT_DEST = ("chat", None)
+
+
+def split_lines(text: str, limit: int) -> list[str]:
+    """
+    Pack whole lines into chunks of at most `limit` characters. Lines longer
+    than `limit` are wrapped at the last space that fits.
+    """
+    chunks, current = [], ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current.rstrip())
+                current = ""
+            cut = line.rfind(" ", 0, limit + 1)
+            if cut <= 0:
+                cut = limit
+            chunks.append(line[:cut].rstrip())
+            line = line[cut:].lstrip()
+        if len(current) + len(line) + 1 > limit:
+            chunks.append(current.rstrip())
+            current = line + "\n"
+        else:
+            current += line + "\n"
+    if current:
+        chunks.append(current.rstrip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def _retrieve(fut):
+    # Nobody has to await a send; mark failures as seen so asyncio doesn't
+    # warn about them. Awaiting callers still get the exception.
+    if not fut.cancelled():
+        fut.exception()
+
+
+class OutboundScheduler:
+    def __init__(self, bot):
+        self.bot = bot
+        self.bucket = TokenBucket(SEND_RATE, SEND_BURST)
+        self._dest_buckets = {CHAT_DEST: TokenBucket(CHAT_RATE, CHAT_BURST)}
+        self._queues = {}                           # (priority, dest) -> deque of [kind, payload, futures, ready_at]
+        self._rings = {p: deque() for p in PRIORITIES}  # priority -> dests with queued messages
+        self._busy = set()                          # dests with a send in flight
+        self._sends = set()                         # in-flight send tasks
+        self._throttled = False                     # last _next() skipped a free dest
+        self._wake = None
+        self._task = None
+
+    # === Public API ===
+    def whisper(self, user_id: str, text: str, priority: int = REPLY, chunks=None):
+        """
+        Queue a whisper, merged with any still queued for the same user and
+        priority. `chunks` is `text` already split (see reply_cache), used as
+        is when there is nothing to merge with. Returns a future resolved
+        once all of `text` is sent.
+        """
+        dest = ("whisper", user_id)
+        queue = self._queues.get((priority, dest))
+        futures, ready_at = [], time.monotonic() + COALESCE_WINDOW
+        if queue:
+            # Repack the queued chunks together with the new text; every
+            # earlier caller's future now completes with the last chunk.
+            parts = []
+            ready_at = queue[0][3]
+            for _, payload, item_futures, _ in queue:
+                parts.append(payload)
+                futures.extend(item_futures)
+            queue.clear()
+            text = "\n".join(parts) + "\n" + text
+            chunks = None
+        chunks = split_lines(text, WHISPER_LIMIT) if chunks is None else list(chunks)
+        if not chunks:
+            chunks = [""] if futures else []
+        fut = None
+        for i, chunk in enumerate(chunks):
+            fut = self._enqueue(priority, dest, "whisper", chunk, ready_at)
+            if i == len(chunks) - 1:
+                self._queues[(priority, dest)][-1][2].extend(futures)
+        return fut
+
+    def chat(self, text: str, priority: int = BROADCAST):
+        fut = None
+        for chunk in split_lines(text, CHAT_LIMIT):
+            fut = self._enqueue(priority, CHAT_DEST, "chat", chunk)
+        return fut
+
+    def emote(self, emote_id: str, user_id: str = None, priority: int = EMOTE):
+        """Queue an emote; a newer emote for the same target replaces one still queued."""
+        pending = self._queues.get((priority, ("emote", user_id)))
+        if pending:
+            pending[-1][1] = emote_id
+            return pending[-1][2][0]
+        return self._enqueue(priority, ("emote", user_id), "emote", emote_id)
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def drain(self, timeout: float = 10):
+        """Wait (up to `timeout` seconds) until everything queued has been sent."""
+        deadline = time.monotonic() + timeout
+        while (self._queues or self._busy) and time.monotonic() < deadline:
+            await asyncio.sleep(IDLE_POLL)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # === Queueing ===
+    def _enqueue(self, priority: int, dest, kind: str, payload, ready_at: float = 0):
+        fut = asyncio.get_running_loop().create_future()
+        fut.add_done_callback(_retrieve)
+        key = (priority, dest)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._rings[priority].append(dest)
+        queue.append([kind, payload, [fut], ready_at])
+        self._ensure_running()
+        self._wake.set()
+        return fut
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _next(self, now: float):
+        """
+        Highest-priority destination that is free to send now, rotating its
+        ring. Sets _throttled when a destination not already sending was
+        held back only by the send rate or the coalescing window.
+        """
+        for priority in PRIORITIES:
+            ring = self._rings[priority]
+            for _ in range(len(ring)):
+                dest = ring[0]
+                ring.rotate(-1)
+                if dest in self._busy:
+                    continue
+                if self._queues[(priority, dest)][0][3] > now:
+                    self._throttled = True
+                    continue
+                dest_bucket = self._dest_buckets.get(dest)
+                if dest_bucket is not None and not dest_bucket.take(now):
+                    self._throttled = True
+                    continue
+                if not self.bucket.take(now):
+                    if dest_bucket is not None:
+                        dest_bucket.refund()
+                    self._throttled = True
+                    return None
+                return priority, dest
+        return None
+
+    async def _run(self):
+        while True:
+            try:
+                picked = None
+                self._throttled = False
+                if self._queues and len(self._busy) < MAX_IN_FLIGHT:
+                    picked = self._next(time.monotonic())
+                if picked is None:
+                    self._wake.clear()
+                    if self._throttled:
+                        # Held back by the rate, not by sends in flight: retry
+                        # once tokens refill. A finished send sets _wake.
+                        try:
+                            await asyncio.wait_for(self._wake.wait(), IDLE_POLL)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self._wake.wait()
+                    continue
+
+                priority, dest = picked
+                key = (priority, dest)
+                queue = self._queues[key]
+                item = queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                    self._rings[priority].remove(dest)
+                self._busy.add(dest)
+                task = asyncio.create_task(self._send(dest, item))
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+
+    async def _send(self, dest, item):
+        kind, payload, futures, _ = item
+        try:
+            highrise = self.bot.highrise
+            if not (highrise.ws and not highrise.ws.closed):
+                result = False
+            elif kind == "whisper":
+                if payload:
+                    await highrise.send_whisper(dest[1], payload)
+                result = True
+            elif kind == "chat":
+                await highrise.chat(payload)
+                result = True
+            else:
+                await highrise.send_emote(payload, dest[1])
+                result = True
+            for fut in futures:
+                if not fut.done():
+                    fut.set_result(result)
+        except Exception as e:
+            if kind != "emote":
+                traceback.print_exc()
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            self._busy.discard(dest)
+            if self._wake is not None:
+                self._wake.set()
@@ -1,29 +1,12 @@
-import json
-import os
 import random
 from typing import Tuple
 from highrise.models import Item
-from functions.data_store import get_free_items_path, get_saved_fits_path, is_owner
-
-FREE_ITEMS_PATH = get_free_items_path()
-SAVED_FITS_PATH = get_saved_fits_path()
-
-# === Load free items ===
-try:
-    with open(FREE_ITEMS_PATH, "r", encoding="utf-8") as f:
-        free_items = json.load(f)
-except Exception:
-    free_items = {}
-
-# === Load saved fits ===
-if os.path.exists(SAVED_FITS_PATH):
-    try:
-        with open(SAVED_FITS_PATH, "r", encoding="utf-8") as f:
-            saved_fits = json.load(f)
-    except Exception:
-        saved_fits = {}
-else:
-    saved_fits = {}
+from functions import reply_cache
+from functions.data_store import load_free_items, load_saved_fits, save_saved_fits, is_owner
+
+# === Load free items and saved fits ===
+free_items = load_free_items()
+saved_fits = load_saved_fits()
 
 # === Category Aliases ===
 category_aliases = {
@@ -88,9 +71,7 @@ def get_category_prefix(category: str) -> str:
     return category.split("_")[0]
 
 def _save_fits():
-    os.makedirs(os.path.dirname(SAVED_FITS_PATH), exist_ok=True)
-    with open(SAVED_FITS_PATH, "w", encoding="utf-8") as f:
-        json.dump(saved_fits, f, indent=2, ensure_ascii=False)
+    save_saved_fits(saved_fits)
 
 # === Outfit Equipping ===
 
@@ -242,6 +223,9 @@ def get_outfit_categories_text() -> str:
         lines.append(f"{emoji} {alias}")
     return "\n".join(lines)
 
+reply_cache.register("fit_help", lambda: "\n".join(get_fit_help_text()))
+reply_cache.register("outfit_category_list", get_outfit_categories_text)
+
 # === Handler ===
 
 async def handle_outfit_command(bot, user, message: str) -> bool:
@@ -255,29 +239,28 @@ async def handle_outfit_command(bot, user, message: str) -> bool:
             try:
                 index = int(trigger[len(f"!{cat_alias} "):])
                 success, msg = await equip_item(bot, cat_alias, index)
-                await bot.highrise.send_whisper(user.id, msg)
+                await bot.send_safe_whisper(user.id, msg)
             except ValueError:
-                await bot.highrise.send_whisper(user.id, f"❌ Invalid number for !{cat_alias}")
+                await bot.send_safe_whisper(user.id, f"❌ Invalid number for !{cat_alias}")
             return True
 
     if trigger.startswith("!remove "):
         cat_alias = trigger[len("!remove "):].strip()
         success, msg = await remove_category(bot, cat_alias)
-        await bot.highrise.send_whisper(user.id, msg)
+        await bot.send_safe_whisper(user.id, msg)
         return True
 
     if trigger == "!fit command":
-        for i in range(0, len(get_fit_help_text()), 5):
-            await bot.highrise.send_whisper(user.id, "\n".join(get_fit_help_text()[i:i+5]))
+        await bot.send_reply(user.id, "fit_help")
         return True
 
     if trigger == "!fit list":
-        await bot.highrise.send_whisper(user.id, list_saved_fits())
+        await bot.send_safe_whisper(user.id, list_saved_fits())
         return True
 
     if trigger == "!fit random":
         success, msg = await load_random_items_from_free(bot)
-        await bot.highrise.send_whisper(user.id, msg)
+        await bot.send_safe_whisper(user.id, msg)
         return True
 
     if trigger.startswith("!fit save "):
@@ -286,9 +269,9 @@ async def handle_outfit_command(bot, user, message: str) -> bool:
             if not (1 <= slot <= 50):
                 raise ValueError()
             success, msg = await save_fit(bot, slot)
-            await bot.highrise.send_whisper(user.id, msg)
+            await bot.send_safe_whisper(user.id, msg)
         except Exception:
-            await bot.highrise.send_whisper(user.id, "❌ Usage: !fit save <1–50>")
+            await bot.send_safe_whisper(user.id, "❌ Usage: !fit save <1–50>")
         return True
 
     if trigger.startswith("!fit remove "):
@@ -297,9 +280,9 @@ async def handle_outfit_command(bot, user, message: str) -> bool:
             if not (1 <= slot <= 50):
                 raise ValueError()
             success, msg = await remove_fit(slot)
-            await bot.highrise.send_whisper(user.id, msg)
+            await bot.send_safe_whisper(user.id, msg)
         except Exception:
-            await bot.highrise.send_whisper(user.id, "❌ Usage: !fit remove <1–50>")
+            await bot.send_safe_whisper(user.id, "❌ Usage: !fit remove <1–50>")
         return True
 
     if trigger.startswith("!fit "):
@@ -311,14 +294,22 @@ async def handle_outfit_command(bot, user, message: str) -> bool:
         else:
             return False
         if not (1 <= slot <= 50):
-            await bot.highrise.send_whisper(user.id, "❌ Slot must be between 1–50")
+            await bot.send_safe_whisper(user.id, "❌ Slot must be between 1–50")
             return True
         success, msg = await load_fit(bot, slot)
-        await bot.highrise.send_whisper(user.id, msg)
+        await bot.send_safe_whisper(user.id, msg)
         return True
 
     if trigger == "!outfit list":
-        await bot.highrise.send_whisper(user.id, get_outfit_categories_text())
+        await bot.send_reply(user.id, "outfit_category_list")
         return True
 
-    return False
\ No newline at end of file
+    return False
+
+def register_outfit_commands(router):
+    router.register(
+        handle_outfit_command,
+        exact=("!fit command", "!fit list", "!fit random", "!outfit list"),
+        prefixes=(*(f"!{alias} " for alias in category_aliases), "!remove ", "!fit "),
+        category="owner",
+    )
\ No newline at end of file
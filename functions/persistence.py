@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+
+# === Background persistence ===
+# All file writes run on one daemon thread, in submission order, so slow disk
+# I/O never blocks the event loop. Whole-file writes to a path that is still
+# waiting in the queue are coalesced: only the newest payload is written.
+
+_queue = queue.Queue()
+_pending = {}           # path -> [text, future] for writes not yet started
+_lock = threading.Lock()
+_worker = None
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="persistence", daemon=True)
+            _worker.start()
+
+def _run():
+    while True:
+        kind, arg, fut = _queue.get()
+        try:
+            if kind == "write":
+                with _lock:
+                    text, fut = _pending.pop(arg)
+                _atomic_write(arg, text)
+                fut.set_result(True)
+            else:
+                fn, args = arg
+                fut.set_result(fn(*args))
+        except Exception as e:
+            traceback.print_exc()
+            if not fut.done():
+                fut.set_exception(e)
+
+def _atomic_write(path: str, text: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+# === Public API ===
+def write_text(path: str, text: str) -> Future:
+    """Queue a whole-file write; returns a Future resolved once it is on disk."""
+    with _lock:
+        entry = _pending.get(path)
+        if entry is not None:
+            entry[0] = text
+            return entry[1]
+        fut = Future()
+        _pending[path] = [text, fut]
+    _queue.put(("write", path, None))
+    _ensure_worker()
+    return fut
+
+def write_json(path: str, data, **dump_kwargs) -> Future:
+    """Serialize `data` now (so later mutations are not seen) and queue the write."""
+    return write_text(path, json.dumps(data, **dump_kwargs))
+
+def submit(fn, *args) -> Future:
+    """Run `fn(*args)` on the persistence thread after everything queued before it."""
+    fut = Future()
+    _queue.put(("call", (fn, args), fut))
+    _ensure_worker()
+    return fut
+
+async def awrite_json(path: str, data, **dump_kwargs):
+    return await asyncio.wrap_future(write_json(path, data, **dump_kwargs))
+
+def flush(timeout: float = None) -> bool:
+    """Block until every write queued so far has finished."""
+    try:
+        submit(lambda: None).result(timeout)
+        return True
+    except Exception:
+        return False
+
+async def aflush():
+    await asyncio.wrap_future(submit(lambda: None))
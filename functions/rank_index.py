@@ -0,0 +1,141 @@
+from bisect import bisect_left, insort
+from itertools import chain
+
+
+class RankIndex:
+    """
+    Order-statistic index of user ids by descending score.
+
+    Keys are kept in a list of sorted buckets with a Fenwick tree over the
+    bucket sizes, so inserts, removals and rank lookups are O(log n) apart
+    from the bounded in-bucket shifting. Ties keep the order in which users
+    were first seen (`seq`), matching a stable sort of the ranks dict.
+    """
+
+    LOAD = 256
+
+    def __init__(self):
+        self._buckets = []   # sorted lists of (-score, seq, user_id)
+        self._maxes = []     # last key of every bucket
+        self._tree = []      # Fenwick tree over bucket sizes (1-based)
+        self._keys = {}      # user_id -> current key
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id):
+        return user_id in self._keys
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            for _, _, user_id in bucket:
+                yield user_id
+
+    # === Bulk load ===
+    def build(self, entries):
+        """Rebuild from an iterable of (user_id, score, seq)."""
+        keys = sorted((-score, seq, user_id) for user_id, score, seq in entries)
+        self._keys = {key[2]: key for key in keys}
+        self._buckets = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._rebuild_tree()
+
+    # === Updates ===
+    def update(self, user_id, score, seq):
+        key = (-score, seq, user_id)
+        old = self._keys.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            self._remove_key(old)
+        self._insert_key(key)
+        self._keys[user_id] = key
+
+    def remove(self, user_id):
+        old = self._keys.pop(user_id, None)
+        if old is not None:
+            self._remove_key(old)
+
+    # === Queries ===
+    def rank(self, user_id):
+        """1-based position of `user_id`, or None if it is not indexed."""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        i = bisect_left(self._maxes, key)
+        return self._prefix(i) + bisect_left(self._buckets[i], key) + 1
+
+    def keys(self):
+        """Copy of every (-score, seq, user_id) key in rank order."""
+        return list(chain.from_iterable(self._buckets))
+
+    def top(self, n):
+        result = []
+        for bucket in self._buckets:
+            for _, _, user_id in bucket:
+                if len(result) >= n:
+                    return result
+                result.append(user_id)
+        return result
+
+    # === Internals ===
+    def _insert_key(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            i -= 1
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets.insert(i + 1, bucket[self.LOAD:])
+            del bucket[self.LOAD:]
+            self._maxes[i] = bucket[-1]
+            self._maxes.insert(i + 1, self._buckets[i + 1][-1])
+            self._rebuild_tree()
+        else:
+            self._add(i, 1)
+
+    def _remove_key(self, key):
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+    def _rebuild_tree(self):
+        n = len(self._buckets)
+        tree = [0] * (n + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, i, delta):
+        i += 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i):
+        """Number of keys stored in buckets[0:i]."""
+        total = 0
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
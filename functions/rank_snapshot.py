@@ -0,0 +1,161 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+# === Binary ranks snapshot ===
+# Layout (little endian):
+#   header   "<4sHHII"  magic, version, flags, record count, string table size
+#   records  "<IIHH4xqq" per user: user_id offset, username offset,
+#            user_id length, username length, messages, time
+#   strings  UTF-8 user ids and usernames, offsets relative to the table start
+# Records keep the ranks.json insertion order, which the leaderboard uses to
+# break ties. FLAG_ASCII marks an all-ASCII string table, which lets readers
+# decode it in one call and slice the resulting str by byte offset.
+
+MAGIC = b"KYRS"
+VERSION = 1
+FLAG_ASCII = 1
+HEADER = struct.Struct("<4sHHII")
+RECORD = struct.Struct("<IIHH4xqq")
+
+
+def encode(data: dict) -> bytes:
+    records = bytearray()
+    strings = bytearray()
+    for user_id, record in data.items():
+        uid = str(user_id).encode("utf-8")
+        name = str(record.get("username", "")).encode("utf-8")
+        uid_off = len(strings)
+        strings += uid
+        name_off = len(strings)
+        strings += name
+        records += RECORD.pack(
+            uid_off, name_off, len(uid), len(name),
+            int(record.get("messages", 0)), int(record.get("time", 0)),
+        )
+    flags = FLAG_ASCII if strings.isascii() else 0
+    return HEADER.pack(MAGIC, VERSION, flags, len(data), len(strings)) + bytes(records) + bytes(strings)
+
+
+def write_snapshot(path: str, data: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RankSnapshot:
+    """
+    Read-only, memory-mapped view of a binary snapshot. Records are decoded
+    only when accessed, so opening a large snapshot is constant time.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{path} is not a ranks snapshot")
+        magic, version, flags, count, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a ranks snapshot")
+        self._count = count
+        self._ascii = bool(flags & FLAG_ASCII)
+        self._strings = HEADER.size + count * RECORD.size
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def record(self, i: int):
+        """(user_id, username, messages, time) of the i-th record."""
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        uid_off, name_off, uid_len, name_len, messages, seconds = RECORD.unpack_from(
+            self._map, HEADER.size + i * RECORD.size
+        )
+        base = self._strings
+        return (
+            self._map[base + uid_off:base + uid_off + uid_len].decode("utf-8"),
+            self._map[base + name_off:base + name_off + name_len].decode("utf-8"),
+            messages,
+            seconds,
+        )
+
+    def __iter__(self):
+        strings = self._map[self._strings:]
+        table = memoryview(self._map)[HEADER.size:self._strings]
+        try:
+            if self._ascii:
+                text = strings.decode("ascii")
+                for uid_off, name_off, uid_len, name_len, messages, seconds in RECORD.iter_unpack(table):
+                    yield (
+                        text[uid_off:uid_off + uid_len],
+                        text[name_off:name_off + name_len],
+                        messages,
+                        seconds,
+                    )
+                return
+            for uid_off, name_off, uid_len, name_len, messages, seconds in RECORD.iter_unpack(table):
+                yield (
+                    strings[uid_off:uid_off + uid_len].decode("utf-8"),
+                    strings[name_off:name_off + name_len].decode("utf-8"),
+                    messages,
+                    seconds,
+                )
+        finally:
+            table.release()
+
+    def to_dict(self) -> dict:
+        return {
+            uid: {"username": name, "messages": messages, "time": seconds}
+            for uid, name, messages, seconds in self
+        }
+
+
+def load_snapshot(path: str) -> dict:
+    with RankSnapshot(path) as snapshot:
+        return snapshot.to_dict()
+
+
+# === JSON import / export ===
+def import_json(json_path: str, snapshot_path: str) -> int:
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    write_snapshot(snapshot_path, data)
+    return len(data)
+
+
+def export_json(snapshot_path: str, json_path: str) -> int:
+    data = load_snapshot(snapshot_path)
+    with open(json_path, "w") as f:
+        json.dump(data, f, indent=2)
+    return len(data)
+
+
+if __name__ == "__main__":
+    # python -m functions.rank_snapshot import data/ranks.json data/ranks.bin
+    # python -m functions.rank_snapshot export data/ranks.bin data/ranks.json
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python -m functions.rank_snapshot import|export <src> <dst>")
+        sys.exit(1)
+    action, src, dst = sys.argv[1:]
+    count = import_json(src, dst) if action == "import" else export_json(src, dst)
+    print(f"✅ {action}ed {count} users: {src} -> {dst}")
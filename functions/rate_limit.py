@@ -0,0 +1,76 @@
+import time
+
+# === Inbound rate limits ===
+# category: (per-user tokens/sec, per-user burst, global tokens/sec, global burst)
+# A global rate of None means the category is only limited per user.
+# "chat" gates command lookup for every room message (stats and the chat log
+# still see it), "whisper" gates incoming whispers before logging or dispatch;
+# the others gate commands of that router category.
+RATE_LIMITS = {
+    "chat":        (2.0, 8, None, None),
+    "whisper":     (1.0, 4, 10.0, 20),
+    "emote":       (0.5, 3, 10.0, 30),
+    "leaderboard": (0.2, 2, 2.0, 6),
+    "floor":       (0.5, 3, 5.0, 15),
+    "owner":       (2.0, 10, 10.0, 30),
+    "general":     (0.5, 3, 5.0, 15),
+}
+
+
+class TokenBucket:
+    """Refills lazily on each check, so an idle bucket costs nothing."""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def take(self, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class RateLimiter:
+    def __init__(self, limits: dict = None):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self._users = {}    # user_id -> {category: TokenBucket}
+        self._global = {
+            category: TokenBucket(g_rate, g_burst)
+            for category, (_, _, g_rate, g_burst) in self.limits.items()
+            if g_rate is not None
+        }
+
+    def allow(self, user_id: str, category: str) -> bool:
+        """Take one token for `user_id` in `category`; False means drop the event."""
+        limit = self.limits.get(category)
+        if limit is None:
+            return True
+        now = time.monotonic()
+        buckets = self._users.get(user_id)
+        if buckets is None:
+            buckets = self._users[user_id] = {}
+        bucket = buckets.get(category)
+        if bucket is None:
+            bucket = buckets[category] = TokenBucket(limit[0], limit[1])
+        if not bucket.take(now):
+            return False
+        shared = self._global.get(category)
+        if shared is not None and not shared.take(now):
+            # The room is saturated; don't charge the user for a dropped event.
+            bucket.refund()
+            return False
+        return True
+
+    def forget(self, user_id: str):
+        self._users.pop(user_id, None)
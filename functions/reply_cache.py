@@ -0,0 +1,36 @@
+from functions.outbound import WHISPER_LIMIT, split_lines
+
+# === Static reply cache ===
+# Help texts and menus are rendered and split into whisper-sized chunks once,
+# then reused for every request. Modules register a renderer per key; call
+# invalidate(key) when the data behind a text changes (e.g. emote_list) and
+# it is rebuilt on next use.
+
+_renderers = {}     # key -> () -> str
+_replies = {}       # key -> (text, chunks)
+
+def register(key: str, render):
+    _renderers[key] = render
+    _replies.pop(key, None)
+
+def get(key: str):
+    """(text, wire-ready chunks) for `key`, or None if nothing is registered."""
+    reply = _replies.get(key)
+    if reply is None:
+        render = _renderers.get(key)
+        if render is None:
+            return None
+        text = render()
+        reply = _replies[key] = (text, tuple(split_lines(text, WHISPER_LIMIT)))
+    return reply
+
+def invalidate(key: str = None):
+    if key is None:
+        _replies.clear()
+    else:
+        _replies.pop(key, None)
+
+def warm():
+    """Render every registered reply now instead of on first request."""
+    for key in list(_renderers):
+        get(key)
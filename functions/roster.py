@@ -0,0 +1,95 @@
+import asyncio
+import time
+import traceback
+
+# === Room roster ===
+# Who is in the room and where, kept current from join / leave / move events
+# so commands and loops can check presence and positions without a
+# get_room_users() round-trip. The roster is re-synced with the server on
+# start (including reconnects) and every RECONCILE_INTERVAL seconds to repair
+# any events that were missed. Events that arrive while a reconcile waits on
+# the server are replayed onto its snapshot, so they are not lost to it.
+
+RECONCILE_INTERVAL = 300
+
+
+class RoomRoster:
+    def __init__(self):
+        self.users = {}         # user_id -> User
+        self.positions = {}     # user_id -> Position | AnchorPosition | None
+        self._by_name = {}      # lowercase username -> user_id
+        self.synced_at = None   # monotonic time of the last reconcile
+        self._recording = []    # one event list per reconcile in flight
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self.users
+
+    def __len__(self):
+        return len(self.users)
+
+    def __iter__(self):
+        """Yields (user, position) pairs like get_room_users().content."""
+        for user_id, user in self.users.items():
+            yield user, self.positions.get(user_id)
+
+    def _record(self, handler, *args):
+        for events in self._recording:
+            events.append((handler, args))
+
+    def on_join(self, user, pos=None):
+        self._record(self.on_join, user, pos)
+        self.users[user.id] = user
+        self.positions[user.id] = pos
+        self._by_name[user.username.lower()] = user.id
+
+    def on_leave(self, user):
+        self._record(self.on_leave, user)
+        if self.users.pop(user.id, None) is not None:
+            self._by_name.pop(user.username.lower(), None)
+        self.positions.pop(user.id, None)
+
+    def on_move(self, user, pos):
+        if user.id not in self.users:
+            self.on_join(user, pos)
+        else:
+            self._record(self.on_move, user, pos)
+            self.positions[user.id] = pos
+
+    def get_position(self, user_id):
+        return self.positions.get(user_id)
+
+    def find(self, username: str):
+        """(user, position) for a username (case-insensitive), or None."""
+        user_id = self._by_name.get(username.lower())
+        if user_id is None:
+            return None
+        return self.users[user_id], self.positions.get(user_id)
+
+    async def reconcile(self, highrise):
+        events = []
+        self._recording.append(events)
+        try:
+            room_users = await highrise.get_room_users()
+        finally:
+            self._recording.remove(events)
+        users, positions, by_name = {}, {}, {}
+        for user, pos in room_users.content:
+            users[user.id] = user
+            positions[user.id] = pos
+            by_name[user.username.lower()] = user.id
+        self.users, self.positions, self._by_name = users, positions, by_name
+        # The snapshot predates whatever arrived during the await; reapply it.
+        for handler, args in events:
+            handler(*args)
+        self.synced_at = time.monotonic()
+
+    async def run(self, highrise, interval: float = RECONCILE_INTERVAL):
+        """Reconcile now and then every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await self.reconcile(highrise)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(interval)
@@ -0,0 +1,82 @@
+import traceback
+
+_END = None  # trie key holding the entries registered for a prefix
+
+
+class CommandRouter:
+    """
+    Central chat command registry.
+
+    Each message is stripped and lowercased once, then matched by one dict
+    lookup for exact phrases, a character-trie walk for prefix commands
+    (e.g. "!setf" in "!setf2") and one membership test per live table a
+    module keeps up to date, so ordinary chatter usually ends after a few
+    dict misses.
+
+    Matching handlers run in registration order with the original message
+    and are expected to return True once they handled it; returning False
+    lets the next candidate try, like the old sequential handler chain.
+
+    With a `limiter` (see functions/rate_limit.py), each candidate first
+    takes a token for its category; an over-limit command is dropped before
+    its handler runs.
+    """
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter
+        self._exact = {}    # phrase -> [entry]
+        self._trie = {}     # char -> node, node[_END] -> [entry]
+        self._tables = []   # (mapping, entry)
+        self._order = 0
+
+    def _entry(self, handler, category):
+        self._order += 1
+        return (self._order, handler, category)
+
+    def register(self, handler, exact=(), prefixes=(), category="general"):
+        """Register `handler(bot, user, message) -> bool` for phrases and prefixes."""
+        entry = self._entry(handler, category)
+        for phrase in exact:
+            self._exact.setdefault(phrase.strip().lower(), []).append(entry)
+        for prefix in prefixes:
+            node = self._trie
+            for ch in prefix.lower():
+                node = node.setdefault(ch, {})
+            node.setdefault(_END, []).append(entry)
+        return entry
+
+    def register_table(self, table, handler, category="general"):
+        """Route messages that are keys of `table`, a dict the caller updates in place."""
+        entry = self._entry(handler, category)
+        self._tables.append((table, entry))
+        return entry
+
+    def match(self, text: str) -> list:
+        found = list(self._exact.get(text, ()))
+        node = self._trie
+        for ch in text:
+            node = node.get(ch)
+            if node is None:
+                break
+            found.extend(node.get(_END, ()))
+        for table, entry in self._tables:
+            if text in table:
+                found.append(entry)
+        if len(found) > 1:
+            found = sorted(set(found))
+        return found
+
+    async def dispatch(self, bot, user, message: str, entries=None) -> bool:
+        """Run the handlers for `message`; `entries` is a match() result already in hand."""
+        if entries is None:
+            entries = self.match(message.strip().lower())
+        for _, handler, category in entries:
+            if self.limiter is not None and not self.limiter.allow(user.id, category):
+                return True
+            try:
+                if await handler(bot, user, message):
+                    return True
+            except Exception:
+                traceback.print_exc()
+                return True
+        return False
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+# === SQLite backend for data_store ===
+# Enabled with KYBOT_STORE=sqlite. Collections are stored one row per
+# top-level key, and saves only touch rows whose JSON actually changed.
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "data", "kybot.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS owners (
+    username TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS records (
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (collection, key)
+);
+CREATE TABLE IF NOT EXISTS ranks (
+    user_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    messages INTEGER NOT NULL DEFAULT 0,
+    time INTEGER NOT NULL DEFAULT 0
+);
+-- Username lookups use the leaderboard's resident index; this one only slowed upserts.
+DROP INDEX IF EXISTS ranks_username;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_conn = None
+_lock = threading.RLock()
+_bodies = {}    # collection -> {key: body} as last written, used to diff saves
+
+def connect(path: str = None) -> sqlite3.Connection:
+    global _conn
+    with _lock:
+        if _conn is None:
+            path = path or DB_PATH
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute("PRAGMA synchronous=NORMAL")
+            _conn.executescript(SCHEMA)
+        return _conn
+
+def close():
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+            _bodies.clear()
+
+# === Owners ===
+def load_owners() -> list[str]:
+    with _lock:
+        rows = connect().execute("SELECT username FROM owners ORDER BY username").fetchall()
+    return [r[0] for r in rows]
+
+def add_owner(username: str) -> bool:
+    with _lock:
+        cur = connect().execute("INSERT OR IGNORE INTO owners (username) VALUES (?)", (username.lower(),))
+    return cur.rowcount > 0
+
+def remove_owner(username: str) -> bool:
+    with _lock:
+        cur = connect().execute("DELETE FROM owners WHERE username = ?", (username.lower(),))
+    return cur.rowcount > 0
+
+# === Collections (bot_location, floors, saved_fits, free_items) ===
+def load_collection(name: str) -> dict:
+    with _lock:
+        rows = connect().execute(
+            "SELECT key, body FROM records WHERE collection = ? ORDER BY rowid", (name,)
+        ).fetchall()
+        _bodies[name] = dict(rows)
+    return {key: json.loads(body) for key, body in rows}
+
+def save_collection(name: str, data: dict):
+    with _lock:
+        conn = connect()
+        if name not in _bodies:
+            load_collection(name)
+        old = _bodies[name]
+        new = {str(key): json.dumps(value, ensure_ascii=False) for key, value in data.items()}
+        changed = [(name, key, body) for key, body in new.items() if old.get(key) != body]
+        removed = [(name, key) for key in old if key not in new]
+        if not changed and not removed:
+            return
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO records (collection, key, body) VALUES (?, ?, ?) "
+                "ON CONFLICT (collection, key) DO UPDATE SET body = excluded.body",
+                changed,
+            )
+            conn.executemany("DELETE FROM records WHERE collection = ? AND key = ?", removed)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            _bodies.pop(name, None)
+            raise
+        _bodies[name] = new
+
+# === Ranks ===
+def load_ranks() -> dict:
+    with _lock:
+        rows = connect().execute(
+            "SELECT user_id, username, messages, time FROM ranks ORDER BY rowid"
+        ).fetchall()
+    return {uid: {"username": name, "messages": msgs, "time": t} for uid, name, msgs, t in rows}
+
+_UPSERT_RANK = (
+    "INSERT INTO ranks (user_id, username, messages, time) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (user_id) DO UPDATE SET username = excluded.username, "
+    "messages = excluded.messages, time = excluded.time"
+)
+
+def _write_ranks(rows: dict, replace: bool = False):
+    with _lock:
+        conn = connect()
+        conn.execute("BEGIN")
+        try:
+            if replace:
+                conn.execute("DELETE FROM ranks")
+            conn.executemany(_UPSERT_RANK, [
+                (uid, r.get("username", ""), r.get("messages", 0), r.get("time", 0))
+                for uid, r in rows.items()
+            ])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def save_rank_rows(rows: dict):
+    """Upsert only the given user_id -> record entries."""
+    if rows:
+        _write_ranks(rows)
+
+def replace_ranks(data: dict):
+    _write_ranks(data, replace=True)
+
+# === One-shot migration from the JSON files ===
+def migrate_from_json(paths: dict, ranks_path: str = None, force: bool = False) -> bool:
+    """
+    Import the JSON data files into the database once.
+    Returns False if a previous migration already ran (unless `force`).
+    """
+    def read(path, default):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return default
+
+    with _lock:
+        conn = connect()
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+        if done and not force:
+            return False
+
+        for owner in read(paths["owners"], []):
+            add_owner(owner)
+        for name in ("bot_location", "floors", "saved_fits", "free_items"):
+            save_collection(name, read(paths[name], {}))
+
+        ranks = {}
+        for uid, record in read(ranks_path or paths["ranks"], {}).items():
+            # Only records in the leaderboard shape are migrated.
+            if isinstance(record, dict) and "username" in record:
+                ranks[uid] = record
+        save_rank_rows(ranks)
+
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+    return True
+
+if __name__ == "__main__":
+    # python -m functions.sqlite_store [ranks.json]
+    from functions.data_store import PATHS
+    ranks_file = sys.argv[1] if len(sys.argv) > 1 else "data/ranks.json"
+    if migrate_from_json(PATHS, ranks_file, force=True):
+        print(f"✅ Migrated JSON data into {DB_PATH}")
@@ -673,6 +673,59 @@ def get_welcome_message(username: str, rank: int = None, is_first_time: bool = F
         # Safe fallback
         return f"👋 Welcome @{username}!", FLOSS_EMOTE
 
+# === Batched welcomes ===
+# Tiers in display order; joins that arrive together are grouped by tier.
+WELCOME_TIERS = ("top10", "top100", "top1000", "new")
+TIER_LABELS = {
+    "top10": "👑 Top 10",
+    "top100": "💘 Top 100",
+    "top1000": "💫 Top 1000",
+    "new": "✨ New faces",
+}
+TIER_EMOTES = {
+    "top10": "emote-graceful",
+    "top100": FLIRT_EMOTE,
+    "top1000": FROLIC_EMOTE,
+    "new": FLOSS_EMOTE,
+}
+
+def get_welcome_tier(rank: int = None, is_first_time: bool = False) -> str:
+    """Tier used by get_welcome_message for this rank."""
+    if is_first_time or rank is None or not 1 <= rank <= 1000:
+        return "new"
+    if rank <= 10:
+        return "top10"
+    if rank <= 100:
+        return "top100"
+    return "top1000"
+
+def get_group_welcome_message(joins: list):
+    """
+    One welcome for several joins of (username, rank, is_first_time).
+    Returns: (welcome_message: str, emote_id: str)
+    """
+    if len(joins) == 1:
+        return get_welcome_message(*joins[0])
+
+    groups = {tier: [] for tier in WELCOME_TIERS}
+    for username, rank, is_first_time in joins:
+        groups[get_welcome_tier(rank, is_first_time)].append((rank or 0, username))
+
+    lines = [f"🎉 Welcome to all {len(joins)} of you!"]
+    emote = None
+    for tier in WELCOME_TIERS:
+        members = sorted(groups[tier])
+        if not members:
+            continue
+        if emote is None:
+            emote = TOP_10_EMOTES.get(members[0][0]) if tier == "top10" else TIER_EMOTES[tier]
+        if tier == "new":
+            names = ", ".join(f"@{username}" for _, username in members)
+        else:
+            names = ", ".join(f"@{username} (#{rank})" for rank, username in members)
+        lines.append(f"{TIER_LABELS[tier]}: {names}")
+    return "\n".join(lines), emote or FLOSS_EMOTE
+
 def should_welcome_user(user_id: str, last_seen: dict, leave_times: dict, cooldown: int = 360) -> bool:
     """
     Returns True only if the user has left the room for more than `cooldown` seconds.
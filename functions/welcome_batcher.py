@@ -0,0 +1,61 @@
+import asyncio
+import traceback
+
+from functions import outbound
+from functions.welcome import get_group_welcome_message
+
+# === Join-storm welcome batching ===
+# Joins are collected for WELCOME_WINDOW seconds after the first one, then
+# welcomed with one chat message (grouped by rank tier) and one emote. A lone
+# join still gets its usual personal welcome, just WELCOME_WINDOW later. The
+# join help whispers are queued at background priority so they never hold up
+# replies to commands.
+
+WELCOME_WINDOW = 2.0
+MAX_BATCH = 40      # a batch this large is welcomed right away
+
+
+class WelcomeBatcher:
+    def __init__(self, bot, window: float = WELCOME_WINDOW):
+        self.bot = bot
+        self.window = window
+        self._pending = []      # (user_id, username, rank, is_first_time)
+        self._timer = None
+        self._flushes = set()   # flush tasks started by the timer
+
+    def add(self, user_id: str, username: str, rank: int, is_first_time: bool):
+        self._pending.append((user_id, username, rank, is_first_time))
+        if len(self._pending) >= MAX_BATCH:
+            self._flush_soon(0)
+        elif self._timer is None:
+            self._flush_soon(self.window)
+
+    def _flush_soon(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        task = asyncio.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            msg, emote_id = get_group_welcome_message(
+                [(username, rank, first) for _, username, rank, first in batch]
+            )
+            if msg:
+                await self.bot.send_long_chat(msg, outbound.WELCOME)
+            if emote_id:
+                self.bot.outbound.emote(emote_id, priority=outbound.WELCOME)
+            for user_id, _, _, _ in batch:
+                await self.bot.send_reply(user_id, "join_help", outbound.BACKGROUND)
+        except Exception:
+            traceback.print_exc()
@@ -1,9 +1,9 @@
 import asyncio
+import atexit
 import time
 import traceback
 import json
 import os
-import re
 import logging
 
 from highrise import BaseBot, Position, AnchorPosition
@@ -15,33 +15,43 @@ from functions.loop_emote import (
     handle_bot_emote_loop,
     emote_list,
     load_bot_loop,
+    register_emote_commands,
+    user_last_positions,
 )
+from functions import outbound, persistence, reply_cache
 from functions.data_store import is_owner, list_owners, add_owner
-from functions.floors import handle_floor_commands
-from functions.outfit import handle_outfit_command
-from functions.color import handle_color_command
+from functions.floors import register_floor_commands
+from functions.outfit import register_outfit_commands
+from functions.color import register_color_commands
 from functions.command import (
-    get_user_commands,
-    get_owner_commands,
-    get_outfit_categories_text,
-    get_command_category_menu,
-    get_category_command_list,
-    handle_owner_commands,
+    register_command_menu,
+    register_owner_commands,
 )
-from functions.bot_movement import handle_bot_position_commands
-from functions.welcome import get_welcome_message, should_welcome_user
+from functions.bot_movement import register_position_commands
+from functions.dispatcher import EventDispatcher
+from functions.emote_scheduler import EmoteScheduler
+from functions.log_setup import setup_logging
+from functions.rate_limit import RateLimiter
+from functions.roster import RoomRoster
+from functions.router import CommandRouter
+from functions.welcome import should_welcome_user
+from functions.welcome_batcher import WelcomeBatcher
 from functions.leaderboard import (
-    load_data,
-    save_data,
+    compact_data,
+    flush_data,
     update_user_stats,
+    add_user_times,
     format_compact_number,
     format_compact_time,
     CHAMPION_TITLES,
     handle_leaderboard_command,
-    get_user_rank,
+    get_room_rank,
+    warm_ranks,
 )
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
+chat_log = logging.getLogger("kybot.chat")
+whisper_log = logging.getLogger("kybot.whisper")
 
 JOINED_USERS_FILE = "data/joined_users.json"
 
@@ -56,30 +66,127 @@ def load_joined_users():
 
 def save_joined_users(data):
     try:
-        with open(JOINED_USERS_FILE, "w") as f:
-            json.dump(data, f)
+        persistence.write_json(JOINED_USERS_FILE, data)
+    except Exception:
+        traceback.print_exc()
+
+def flush_joined_users(bot):
+    # Joins only mark the resident dict dirty; it is written out with the
+    # periodic time accrual and on stop.
+    if bot.joined_users_dirty:
+        bot.joined_users_dirty = False
+        save_joined_users(bot.joined_users)
+
+def save_on_exit(bot):
+    # The SDK never calls on_stop, and the persistence thread is a daemon that
+    # dies with the interpreter, so whatever is still buffered is written here.
+    try:
+        flush_joined_users(bot)
+        flush_data(force=True)
+        persistence.flush(10)
     except Exception:
         traceback.print_exc()
 
 def is_ws_connected(bot) -> bool:
     return hasattr(bot, "highrise") and bot.highrise.ws and not bot.highrise.ws.closed
 
+# Room time is credited from each user's join timestamp, in whole seconds,
+# every TIME_ACCRUAL_INTERVAL seconds and when the user leaves.
+TIME_ACCRUAL_INTERVAL = 60
+
+def accrue_user_times(bot, user_ids=None):
+    now = time.time()
+    entries = []
+    for user_id in list(bot.current_users) if user_ids is None else user_ids:
+        since = bot.user_time_accrued.get(user_id)
+        username = bot.current_users.get(user_id)
+        if since is None or username is None:
+            continue
+        seconds = int(now - since)
+        if seconds > 0:
+            bot.user_time_accrued[user_id] = since + seconds
+            entries.append((user_id, username, seconds))
+    add_user_times(entries)
+
 async def increment_user_times(bot):
     while True:
         try:
-            data = load_data()
-            for user_id, username in list(bot.current_users.items()):
-                update_user_stats(user_id, username, data=data, inc_time=60)
-            save_data(data)
+            accrue_user_times(bot)
+            flush_joined_users(bot)
         except Exception:
             traceback.print_exc()
-        await asyncio.sleep(60)
+        await asyncio.sleep(TIME_ACCRUAL_INTERVAL)
+
+# === Chat commands handled here ===
+async def handle_leaderboard_chat(bot, user, message: str) -> bool:
+    async def whisper_fn(target_user, msg):
+        await bot.send_safe_whisper(target_user.id, msg)
+
+    async def chat_fn(msg):
+        await bot.send_long_chat(msg)
+
+    def is_owner_fn(username):
+        return is_owner(username)
+
+    await handle_leaderboard_command(
+        message, user,
+        whisper_fn=whisper_fn,
+        chat_fn=chat_fn,
+        is_owner_fn=is_owner_fn,
+    )
+    return True
+
+async def handle_emote_list(bot, user, message: str) -> bool:
+    await bot.send_reply(user.id, "emote_list")
+    return True
+
+async def handle_help(bot, user, message: str) -> bool:
+    await bot.send_reply(user.id, "user_help")
+    return True
+
+reply_cache.register("join_help", lambda: (
+    "👋 Welcome!\n"
+    "🏆 Type `leaderboard` to view categories\n"
+    "🔹 `rank` to view your ranks\n"
+    "🎭 `emote` to view emote list"
+))
+
+def build_router(limiter=None) -> CommandRouter:
+    # Registration order is dispatch priority when several commands match.
+    router = CommandRouter(limiter)
+    register_position_commands(router)
+    register_emote_commands(router)
+    router.register(
+        handle_leaderboard_chat,
+        prefixes=("rank", "leaderboard", "lb", "show"),
+        category="leaderboard",
+    )
+    register_command_menu(router)
+    router.register(
+        handle_emote_list,
+        exact=("emotelist", "emoteslist", "emote list", "emotes list", "!emotes", "emote", "emotes"),
+    )
+    register_floor_commands(router)
+    register_owner_commands(router)
+    register_outfit_commands(router)
+    register_color_commands(router)
+    router.register(handle_help, exact=("!help",))
+    return router
 
 class Bot(BaseBot):
     def __init__(self):
         super().__init__()
-        self.user_loops = {}
+        self.emote_scheduler = EmoteScheduler(self)
+        self.user_loops = self.emote_scheduler.loops
         self.loop_emote_list = emote_list
+        reply_cache.warm()
+        self.limiter = RateLimiter()
+        self.router = build_router(self.limiter)
+        self.dispatcher = EventDispatcher()
+        self.roster = RoomRoster()
+        self.outbound = outbound.OutboundScheduler(self)
+        self.welcomes = WelcomeBatcher(self)
+        self.roster_task = None
         self.ignored_bots = ["MonsterBud", "MonsterBeat"]
         self.bot_owners = list_owners()
         if not self.bot_owners:
@@ -97,58 +204,37 @@ class Bot(BaseBot):
         self.user_leave_time = {}
         self.user_join_time = {}
         self.current_users = {}  # user.id -> username
+        self.user_time_accrued = {}  # user.id -> timestamp room time is credited up to
         self.user_last_seen = {}  # user.id -> last seen timestamp
+        self.joined_users = load_joined_users()  # lowercase username -> first join timestamp
+        self.joined_users_dirty = False
+        atexit.register(save_on_exit, self)
 
-    async def send_safe_whisper(self, user_id: str, text: str):
+    async def send_safe_whisper(self, user_id: str, text: str, priority: int = None, chunks=None):
+        """Queue a whisper on the outbound scheduler; replies to owners go first."""
         try:
-            if not is_ws_connected(self):
+            if not text or not is_ws_connected(self):
                 return
-            MAX_LEN = 240
-            lines = text.split('\n')
-            chunks, curr = [], ""
-            for line in lines:
-                if len(curr) + len(line) + 1 > MAX_LEN:
-                    chunks.append(curr.rstrip())
-                    curr = line + "\n"
-                else:
-                    curr += line + "\n"
-            if curr:
-                chunks.append(curr.rstrip())
-            for chunk in chunks:
-                try:
-                    if not is_ws_connected(self):
-                        return
-                    await self.highrise.send_whisper(user_id, chunk)
-                    await asyncio.sleep(0.35)
-                except Exception:
-                    traceback.print_exc()
+            if priority is None:
+                user = self.roster.users.get(user_id)
+                priority = outbound.OWNER if user and is_owner(user.username) else outbound.REPLY
+            self.outbound.whisper(user_id, text, priority, chunks)
         except Exception:
             traceback.print_exc()
 
-    async def send_long_chat(self, message: str):
+    async def send_reply(self, user_id: str, key: str, priority: int = None) -> bool:
+        """Whisper a pre-rendered reply from reply_cache; False if `key` is unknown."""
+        reply = reply_cache.get(key)
+        if reply is None:
+            return False
+        await self.send_safe_whisper(user_id, reply[0], priority, reply[1])
+        return True
+
+    async def send_long_chat(self, message: str, priority: int = outbound.BROADCAST):
         try:
             if not message or not is_ws_connected(self):
                 return
-            lines = message.split("\n")
-            chunks = []
-            current = ""
-            for line in lines:
-                if len(current) + len(line) + 1 > 400:
-                    chunks.append(current.rstrip())
-                    current = line + "\n"
-                else:
-                    current += line + "\n"
-            if current:
-                chunks.append(current.rstrip())
-
-            for chunk in chunks:
-                try:
-                    if not is_ws_connected(self):
-                        return
-                    await self.highrise.chat(chunk)
-                    await asyncio.sleep(1.5)
-                except Exception as e:
-                    logging.warning(f"Failed to send chat message: {e}")
+            self.outbound.chat(message, priority)
         except Exception:
             traceback.print_exc()
 
@@ -157,17 +243,36 @@ class Bot(BaseBot):
             await asyncio.sleep(2)
             self.bot_user_id = session_metadata.user_id
             load_bot_loop()
+            warm_ranks()
+            self.dispatcher.start()
+            self.emote_scheduler.ensure_running()
+            # Re-synced on every (re)connect, then periodically.
+            if self.roster_task:
+                self.roster_task.cancel()
+            self.roster_task = asyncio.create_task(self.roster.run(self.highrise))
             asyncio.create_task(increment_user_times(self))
         except Exception:
             traceback.print_exc()
         logging.info("Bot ready ✅")
 
     async def on_stop(self):
+        if self.roster_task:
+            self.roster_task.cancel()
+            self.roster_task = None
+        await self.dispatcher.stop()
+        self.emote_scheduler.close()
+        await self.welcomes.flush()
+        await self.outbound.drain()
+        self.outbound.close()
+        accrue_user_times(self)
+        flush_joined_users(self)
+        compact_data()
+        await persistence.aflush()
         logging.info("Bot stopped.")
 
     async def on_user_join(self, user: User, pos=None):
         try:
-            from functions.loop_emote import user_last_positions
+            self.roster.on_join(user, pos)
             if pos:
                 user_last_positions[user.id] = (pos.x, pos.y, pos.z)
 
@@ -177,54 +282,44 @@ class Bot(BaseBot):
             now = time.time()
             self.user_join_time[user.id] = now
             self.current_users[user.id] = user.username
+            self.user_time_accrued.setdefault(user.id, now)
             self.user_last_seen[user.id] = now
 
             username_lower = user.username.lower()
-            joined_users = load_joined_users()
-            first_time = username_lower not in joined_users
+            first_time = username_lower not in self.joined_users
 
             if should_welcome_user(user.id, self.user_last_seen, self.user_leave_time):
                 if first_time:
-                    joined_users[username_lower] = int(now)
-                    save_joined_users(joined_users)
-
-                leaderboard_data = load_data()
-                rank_info = get_user_rank(user.id)
-                rank = rank_info["room_rank"] if rank_info else 9999
-
-                msg, emote_id = get_welcome_message(user.username, rank, first_time)
-
-                if msg:
-                    asyncio.create_task(self.send_long_chat(msg))
-                if emote_id:
-                    try:
-                        await self.highrise.send_emote(emote_id)
-                    except Exception:
-                        traceback.print_exc()
-
-                help_txt = (
-                    "👋 Welcome!\n"
-                    "🏆 Type `leaderboard` to view categories\n"
-                    "🔹 `rank` to view your ranks\n"
-                    "🎭 `emote` to view emote list"
-                )
-                asyncio.create_task(self.send_safe_whisper(user.id, help_txt))
+                    self.joined_users[username_lower] = int(now)
+                    self.joined_users_dirty = True
+
+                rank = get_room_rank(user.id) or 9999
+
+                self.welcomes.add(user.id, user.username, rank, first_time)
         except Exception:
             traceback.print_exc()
 
     async def on_user_leave(self, user: User):
         try:
+            self.roster.on_leave(user)
+            accrue_user_times(self, [user.id])
+            self.user_time_accrued.pop(user.id, None)
             self.current_users.pop(user.id, None)
+            self.limiter.forget(user.id)
             self.user_leave_time[user.id] = time.time()
             self.user_join_time.pop(user.id, None)
         except Exception:
             traceback.print_exc()
 
     async def on_user_move(self, user: User, pos: Position | AnchorPosition):
+        self.roster.on_move(user, pos)
+        if user.username not in self.ignored_bots:
+            self.dispatcher.submit(user.id, self.process_move, user, pos)
+
+    async def process_move(self, user: User, pos: Position | AnchorPosition):
         try:
-            if user.username not in self.ignored_bots:
-                await handle_user_movement(self, user, pos)
-                self.user_last_seen[user.id] = time.time()
+            await handle_user_movement(self, user, pos)
+            self.user_last_seen[user.id] = time.time()
         except Exception:
             traceback.print_exc()
 
@@ -236,66 +331,17 @@ class Bot(BaseBot):
             self.user_last_seen[user.id] = time.time()
             update_user_stats(user.id, user.username, inc_msg=True)
 
-            logging.info(f"{user.username} said: {message}")
-
-            if await handle_bot_position_commands(self, user, message):
-                return
-
-            await check_and_start_emote_loop(self, user, message)
+            chat_log.info("%s said: %s", user.username, message)
 
-            low_msg = message.lower().strip()
-            if low_msg.startswith(("rank", "leaderboard", "lb", "show")):
-                async def whisper_fn(target_user, msg):
-                    await self.send_safe_whisper(target_user.id, msg)
-
-                async def chat_fn(msg):
-                    await self.send_long_chat(msg)
-
-                def is_owner_fn(username):
-                    return is_owner(username)
-
-                await handle_leaderboard_command(
-                    message, user,
-                    whisper_fn=whisper_fn,
-                    chat_fn=chat_fn,
-                    is_owner_fn=is_owner_fn,
-                )
-                return
-
-            if is_owner(user.username):
-                if low_msg == "!command":
-                    await self.send_safe_whisper(user.id, get_command_category_menu())
-                    return
-                m = re.match(r"!(\w+)", low_msg)
-                if m:
-                    res = get_category_command_list(m.group(1))
-                    if res:
-                        await self.send_safe_whisper(user.id, res)
-                        return
-
-            if low_msg.replace(" ", "") in ["emotelist", "emoteslist", "!emotes", "emote", "emotes"]:
-                names = [aliases[1].capitalize() for aliases, _, _, allowed in self.loop_emote_list if allowed and len(aliases) > 1]
-                for i in range(0, len(names), 20):
-                    await self.send_safe_whisper(user.id, ", ".join(names[i:i + 20]))
-                return
-
-            if await handle_floor_commands(self, user, message):
+            # Every line is counted and logged; the chat bucket only holds
+            # back command handling for users flooding the room.
+            if not self.limiter.allow(user.id, "chat"):
                 return
 
-            if await handle_owner_commands(self, user, message):
-                return
-
-            if is_owner(user.username):
-                if await handle_outfit_command(self, user, message):
-                    return
-                if await handle_color_command(self, user, message):
-                    return
-
-            if low_msg == "!help":
-                cmds = get_user_commands()
-                for i in range(0, len(cmds), 5):
-                    await self.send_safe_whisper(user.id, "\n".join(cmds[i:i + 5]))
-                return
+            # Only commands take a worker; ordinary chatter ends at the lookup.
+            entries = self.router.match(message.strip().lower())
+            if entries:
+                self.dispatcher.submit(user.id, self.router.dispatch, self, user, message, entries)
 
         except Exception:
             traceback.print_exc()
@@ -304,13 +350,18 @@ class Bot(BaseBot):
         try:
             if user.username in self.ignored_bots:
                 return
-            logging.info(f"{user.username} whispered: {message}")
+            if not self.limiter.allow(user.id, "whisper"):
+                return
+            whisper_log.info("%s whispered: %s", user.username, message)
 
             self.user_last_seen[user.id] = time.time()
 
             if user.username.lower() == "raybm" or is_owner(user.username):
-                await self.send_long_chat(message)
-                await handle_bot_emote_loop(self, user, message)
-                await check_and_start_emote_loop(self, user, message)
+                self.dispatcher.submit(user.id, self.process_whisper, user, message)
         except Exception:
-            traceback.print_exc()
\ No newline at end of file
+            traceback.print_exc()
+
+    async def process_whisper(self, user: User, message: str):
+        await self.send_long_chat(message)
+        await handle_bot_emote_loop(self, user, message)
+        await check_and_start_emote_loop(self, user, message)
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from functions.dispatcher import EventDispatcher
+
+
+class EventDispatcherTest(unittest.TestCase):
+    def test_first_submit_starts_workers_and_queues_key_once(self):
+        async def scenario():
+            dispatcher = EventDispatcher(workers=2)
+            seen = []
+
+            async def handle(n):
+                await asyncio.sleep(0)
+                seen.append(n)
+
+            self.assertTrue(dispatcher.submit("u1", handle, 1))
+            self.assertTrue(dispatcher.submit("u1", handle, 2))
+            await asyncio.sleep(0.01)
+            self.assertTrue(all(not task.done() for task in dispatcher._tasks))
+            await dispatcher.stop()
+            return seen
+
+        self.assertEqual(asyncio.run(scenario()), [1, 2])
+
+    def test_restart_on_new_event_loop(self):
+        dispatcher = EventDispatcher(workers=2)
+        seen = []
+
+        async def handle(n):
+            seen.append(n)
+
+        async def scenario(n):
+            dispatcher.submit("u1", handle, n)
+            await asyncio.sleep(0.01)
+
+        # The first loop closes with the workers still alive; the second
+        # submit must notice they are gone and start fresh ones.
+        asyncio.run(scenario(1))
+        asyncio.run(scenario(2))
+        self.assertEqual(seen, [1, 2])
+        self.assertEqual(dispatcher.pending("u1"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
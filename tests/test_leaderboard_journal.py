@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from functions import leaderboard, persistence
+
+
+class JournalRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        os.makedirs("data")
+        leaderboard._data = None
+        leaderboard._dirty.clear()
+
+    def tearDown(self):
+        persistence.flush()
+        leaderboard._data = None
+        leaderboard._dirty.clear()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_append_after_torn_line_is_kept(self):
+        with open(leaderboard.JOURNAL_PATH, "w", encoding="utf-8") as f:
+            f.write('["a","A",5,0]\n["a","A",6,0')
+
+        data = leaderboard.load_data()
+        self.assertEqual(data["a"]["messages"], 5)
+
+        leaderboard.update_user_stats("b", "B", inc_msg=True)
+        leaderboard.flush_data(force=True)
+        persistence.flush()
+
+        leaderboard._data = None
+        data = leaderboard.load_data()
+        self.assertEqual(data["a"]["messages"], 5)
+        self.assertEqual(data["b"]["messages"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
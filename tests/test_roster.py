@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sys
+import types
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from functions.roster import RoomRoster
+
+
+def user(user_id, username):
+    return types.SimpleNamespace(id=user_id, username=username)
+
+
+class SlowHighrise:
+    """get_room_users() answers with `content` once `release` is set."""
+
+    def __init__(self, content):
+        self.content = content
+        self.release = asyncio.Event()
+
+    async def get_room_users(self):
+        await self.release.wait()
+        return types.SimpleNamespace(content=self.content)
+
+
+class RoomRosterTest(unittest.TestCase):
+    def test_events_during_reconcile_survive_the_snapshot(self):
+        async def scenario():
+            roster = RoomRoster()
+            alice, bob, carol = user("a", "Alice"), user("b", "Bob"), user("c", "Carol")
+            roster.on_join(alice, "pa")
+            roster.on_join(bob, "pb")
+            highrise = SlowHighrise([(alice, "pa"), (bob, "pb")])
+
+            task = asyncio.create_task(roster.reconcile(highrise))
+            await asyncio.sleep(0)
+            roster.on_join(carol, "pc")
+            roster.on_leave(bob)
+            roster.on_move(alice, "pa2")
+            highrise.release.set()
+            await task
+            return roster
+
+        roster = asyncio.run(scenario())
+        self.assertIn("c", roster)
+        self.assertNotIn("b", roster)
+        self.assertEqual(roster.get_position("a"), "pa2")
+        self.assertIsNone(roster.find("bob"))
+        self.assertEqual(roster.find("carol")[1], "pc")
+        self.assertEqual(roster._recording, [])
+
+
+if __name__ == "__main__":
+    unittest.main()